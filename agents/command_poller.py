@@ -3,19 +3,27 @@
 Polls a Google-Doc queue, validates commands, pushes them onto Redis bus.
 """
 import os
+import re
 import json
 import time
 import yaml
 import redis
+import socket
 import hashlib
 import logging
 import pathlib
 import datetime
-import requests
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional
 from cerberus import Validator
-from google.oauth2.service_account import Credentials
-from googleapiclient.discovery import build
+
+try:
+    import orjson
+
+    def _dumps(obj) -> bytes:
+        return orjson.dumps(obj)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -24,12 +32,58 @@ logging.basicConfig(
 log = logging.getLogger("poller")
 
 # ---------- config ----------
-CFG_PATH = pathlib.Path(__file__).parents[1] / "config.yaml"
-CFG = yaml.safe_load(CFG_PATH.read_text())["command_poller"]
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+CFG_PATH = ROOT / "config.yaml"
+COMMAND_QUEUE_PATH = ROOT / "command_queue.txt"
+# Bytes before the fallback file's read offset that must be unchanged for a tail read
+FALLBACK_CHECK_BYTES = 64
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+_cfg_cache: Dict = {"mtime": None, "data": None}
+
+def get_cfg() -> Dict:
+    """Poller section of config.yaml, re-parsed only when the file changes"""
+    mtime = CFG_PATH.stat().st_mtime
+    if mtime != _cfg_cache["mtime"]:
+        _cfg_cache["data"] = yaml.load(CFG_PATH.read_text(), Loader=_YamlLoader)["command_poller"]
+        _cfg_cache["mtime"] = mtime
+    return _cfg_cache["data"]
 
 # ---------- Redis ----------
 REDIS_URL = os.getenv("REDIS_URL", "redis://127.0.0.1:6379/0")
-r = redis.from_url(REDIS_URL, decode_responses=True)
+
+def _keepalive_options() -> Dict[int, int]:
+    """TCP keepalive tuning, limited to the options this platform has"""
+    wanted = {"TCP_KEEPIDLE": 30, "TCP_KEEPINTVL": 10, "TCP_KEEPCNT": 3}
+    return {getattr(socket, k): v for k, v in wanted.items() if hasattr(socket, k)}
+
+# Keepalive + health checks stop idle BLPOP connections being dropped by NAT
+pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=16,
+    decode_responses=True,
+    socket_keepalive=True,
+    socket_keepalive_options=_keepalive_options(),
+    health_check_interval=30,
+)
+r = redis.Redis(connection_pool=pool)
+
+# Each task type has its own list, so agents only ever pop their own work
+TASK_QUEUE = "agent_tasks"
+
+def _task_queue(task_type: str) -> str:
+    return f"{TASK_QUEUE}:{task_type}"
+
+def _processed_key() -> str:
+    """Redis set of _hash() digests of handled lines (same value as task["id"]).
+
+    Kept in Redis rather than in memory so a restarted poller doesn't
+    re-run every command still in the doc.
+    """
+    return get_cfg().get("processed_key", "agentkit:processed_commands")
 
 # ---------- schemas ----------
 SCHEMAS = {
@@ -47,14 +101,90 @@ SCHEMAS = {
     "KILL_SWITCH": {},
 }
 
+# Built once; Validator() re-parses its schema on every construction
+_VALIDATORS = {cmd: Validator(schema) for cmd, schema in SCHEMAS.items()}
+
 def _now() -> str:
-    return datetime.datetime.utcnow().isoformat() + "Z"
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return now.isoformat(timespec="milliseconds").replace("+00:00", "Z")
 
 def _hash(s: str) -> str:
-    return hashlib.sha256(s.encode()).hexdigest()[:12]
+    # Same 12 hex chars as hexdigest()[:12] without building the full string
+    return hashlib.sha256(s.encode()).digest()[:6].hex()
+
+# Non-comment line containing at least one key=value pair
+_COMMAND_LINE_RE = re.compile(r"(?!#).*=", re.DOTALL)
+_EMPTY: Dict = {}
+
+def _iter_text_runs(content: List[Dict]) -> Iterator[str]:
+    """Yield the raw text of every run in a Docs body, in document order"""
+    for element in content:
+        for run in element.get('paragraph', _EMPTY).get('elements', ()):
+            text = run.get('textRun', _EMPTY).get('content')
+            if text:
+                yield text
+
+def _parse_fallback(data: bytes) -> List[str]:
+    return [l.strip() for l in data.decode().splitlines() if l.strip() and not l.startswith("#")]
+
+class CommandFileTail:
+    """Commands in a local file that is normally only appended to.
+
+    Only bytes added since the last read are parsed; a replaced, truncated
+    or edited file is re-read whole.
+    """
+
+    def __init__(self, path: pathlib.Path):
+        self.path = path
+        # Commands from complete lines up to _offset of the file with inode _ino
+        self._ino: Optional[int] = None
+        self._mtime = 0
+        self._offset = 0
+        self._check = b""
+        self._commands: List[str] = []
+
+    def read(self) -> List[str]:
+        st = self.path.stat()
+        if (st.st_ino == self._ino and st.st_size == self._offset
+                and st.st_mtime_ns == self._mtime):
+            return self._commands
+        self._mtime = st.st_mtime_ns
+
+        with open(self.path, "rb") as f:
+            if st.st_ino == self._ino and st.st_size > self._offset:
+                f.seek(self._offset - len(self._check))
+                data = f.read()
+                intact = data.startswith(self._check)
+            else:
+                intact = False
+            if intact:
+                data = data[len(self._check):]
+            else:
+                f.seek(0)
+                data = f.read()
+                self._ino = st.st_ino
+                self._offset = 0
+                self._check = b""
+                self._commands = []
+
+        # A last line without its newline yet is returned but re-read next time
+        end = data.rfind(b"\n") + 1
+        consumed = (self._check + data[:end])[-FALLBACK_CHECK_BYTES:]
+        new = _parse_fallback(data[:end])
+        if new:
+            self._commands = self._commands + new
+        if end:
+            self._offset += end
+            self._check = consumed
+        partial = _parse_fallback(data[end:])
+        return self._commands + partial if partial else self._commands
 
 class GoogleDocsClient:
     def __init__(self):
+        # Google SDKs are heavy; only pay for them when the client is built
+        from google.oauth2.service_account import Credentials
+        from googleapiclient.discovery import build
+
         # Use service account key from environment or file
         creds_path = os.getenv("GOOGLE_CREDENTIALS_PATH")
         if creds_path and pathlib.Path(creds_path).exists():
@@ -70,30 +200,46 @@ class GoogleDocsClient:
         
         if self.creds:
             self.service = build('docs', 'v1', credentials=self.creds)
+            self.drive = build('drive', 'v3', credentials=self.creds)
         else:
             self.service = None
+            self.drive = None
+
+        # Last parsed command list, keyed by the Drive head revision it came from
+        self._revision: Optional[str] = None
+        self._cached_commands: List[str] = []
+
+        self._fallback = CommandFileTail(COMMAND_QUEUE_PATH)
     
+    def _head_revision(self, doc_id: str) -> Optional[str]:
+        """Cheap metadata call; None if the revision can't be determined"""
+        try:
+            meta = self.drive.files().get(fileId=doc_id, fields="headRevisionId").execute()
+            return meta.get("headRevisionId")
+        except Exception as e:
+            log.debug("Could not fetch revision for %s: %s", doc_id, e)
+            return None
+
     def read_doc(self, doc_id: str) -> List[str]:
         if not self.service:
             log.warning("No Google Docs service available, using fallback")
             return self._read_fallback()
         
+        revision = self._head_revision(doc_id)
+        if revision is not None and revision == self._revision:
+            return self._cached_commands
+
         try:
             doc = self.service.documents().get(documentId=doc_id).execute()
-            content = doc.get('body', {}).get('content', [])
-            
-            commands = []
-            for element in content:
-                if 'paragraph' in element:
-                    paragraph = element['paragraph']
-                    text_run = paragraph.get('elements', [])
-                    for run in text_run:
-                        if 'textRun' in run:
-                            text = run['textRun']['content'].strip()
-                            if text and not text.startswith('#') and '=' in text:
-                                commands.append(text)
+            content = doc.get('body', _EMPTY).get('content', ())
+            commands = [
+                text for text in (t.strip() for t in _iter_text_runs(content))
+                if _COMMAND_LINE_RE.match(text)
+            ]
             
             log.info("Read %d commands from Google Doc %s", len(commands), doc_id)
+            self._revision = revision
+            self._cached_commands = commands
             return commands
             
         except Exception as e:
@@ -102,20 +248,28 @@ class GoogleDocsClient:
     
     def _read_fallback(self) -> List[str]:
         """Fallback to local file if Google Docs unavailable"""
-        path = pathlib.Path(__file__).parents[1] / "command_queue.txt"
-        if not path.exists():
-            path.write_text("# Add commands below\n")
-        return [l.strip() for l in path.read_text().splitlines() if l.strip() and not l.startswith("#")]
+        if not COMMAND_QUEUE_PATH.exists():
+            COMMAND_QUEUE_PATH.write_text("# Add commands below\n")
+        return self._fallback.read()
 
 class NotionClient:
     def __init__(self):
-        self.token = os.getenv("NOTION_TOKEN") or CFG.get("notion", {}).get("token")
+        self.token = os.getenv("NOTION_TOKEN") or get_cfg().get("notion", {}).get("token")
         self.headers = {
             "Authorization": f"Bearer {self.token}",
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28"
         }
+        self._session = None
     
+    def _get_session(self):
+        """Lazily build one keep-alive session shared by all Notion calls"""
+        if self._session is None:
+            import requests
+            self._session = requests.Session()
+            self._session.headers.update(self.headers)
+        return self._session
+
     def update_page(self, page_id: str, content: str) -> bool:
         if not self.token or "secret_" in self.token:
             log.warning("No valid Notion token configured")
@@ -137,7 +291,7 @@ class NotionClient:
                 }
             }
             
-            response = requests.patch(url, headers=self.headers, json=payload)
+            response = self._get_session().patch(url, data=_dumps(payload), timeout=10)
             if response.status_code == 200:
                 log.info("Successfully updated Notion page %s", page_id)
                 return True
@@ -151,14 +305,23 @@ class NotionClient:
 
 class Poller:
     def __init__(self):
-        self.processed: set[str] = set()
         self.google_client = GoogleDocsClient()
         self.notion_client = NotionClient()
         self.kill_switch_active = False
+        self._ks_checked_at = float("-inf")
+        # Command list seen on the last successful tick
+        self._last_commands: List[str] = []
     
     def check_kill_switch(self) -> bool:
-        """Check Redis for kill switch signal"""
-        kill_key = CFG.get("kill_switch_key", "agentkit_kill_switch")
+        """Check Redis for kill switch signal, at most once per TTL window"""
+        if self.kill_switch_active:
+            return True
+        cfg = get_cfg()
+        now = time.monotonic()
+        if now - self._ks_checked_at < cfg.get("kill_switch_ttl_seconds", 2.0):
+            return False
+        self._ks_checked_at = now
+        kill_key = cfg.get("kill_switch_key", "agentkit_kill_switch")
         if r.get(kill_key):
             log.warning("Kill switch activated!")
             self.kill_switch_active = True
@@ -166,20 +329,28 @@ class Poller:
         return False
 
     def validate(self, raw: str) -> Optional[Dict]:
-        parts = raw.split()
-        cmd = parts[0].upper()
-        if cmd not in SCHEMAS:
+        head, *rest = raw.split(maxsplit=1)
+        cmd = head.upper()
+        v = _VALIDATORS.get(cmd)
+        if v is None:
             log.warning("Unknown command: %s", cmd)
             return None
-        params = {p.split("=")[0]: p.split("=")[1] for p in parts[1:] if "=" in p}
-        v = Validator(SCHEMAS[cmd])
+        params = {}
+        for tok in rest[0].split() if rest else ():
+            key, eq, value = tok.partition("=")
+            if eq:
+                params[key] = value
         if not v.validate(params):
             log.error("Validation failed: %s", v.errors)
             return None
         return {"type": cmd, "params": params, "raw": raw}
 
-    def execute_command(self, task: Dict):
-        """Execute commands directly instead of just queuing them"""
+    def execute_command(self, task: Dict, pending: Optional[List[Dict]] = None):
+        """Execute commands directly instead of just queuing them.
+
+        Commands meant for other agents are appended to ``pending`` when
+        given, so the caller can push them in one batch.
+        """
         cmd_type = task["type"]
         params = task["params"]
         
@@ -191,37 +362,92 @@ class Poller:
                 log.error("Failed to execute UPDATE_NOTION")
         
         elif cmd_type == "KILL_SWITCH":
-            kill_key = CFG.get("kill_switch_key", "agentkit_kill_switch")
+            kill_key = get_cfg().get("kill_switch_key", "agentkit_kill_switch")
             r.set(kill_key, "active")
             log.warning("Kill switch activated via command")
             self.kill_switch_active = True
         
         else:
             # Queue other commands for agents to process
-            self.push_to_queue(task)
+            if pending is None:
+                self.push_to_queue(task)
+            else:
+                pending.append(task)
     
-    def push_to_queue(self, task: Dict):
+    def _encode_task(self, task: Dict, ts: Optional[str] = None) -> bytes:
         task["id"] = _hash(task["raw"])
-        task["ts"] = _now()
-        r.lpush("agent_tasks", json.dumps(task))
+        task["ts"] = ts or _now()
+        return _dumps(task)
+
+    def push_to_queue(self, task: Dict):
+        r.lpush(_task_queue(task["type"]), self._encode_task(task))
         log.info("Pushed task %s to Redis queue", task["id"])
 
+    def push_many(self, tasks: List[Dict], processed: Optional[List[str]] = None):
+        """Push several tasks in a single Redis round-trip.
+
+        ``processed`` line hashes are recorded in the same MULTI/EXEC, so a
+        line is marked handled exactly when its task reaches the queue.
+        """
+        if not tasks and not processed:
+            return
+        ts = _now()  # one timestamp for the whole batch
+        pipe = r.pipeline()
+        for task in tasks:
+            pipe.lpush(_task_queue(task["type"]), self._encode_task(task, ts))
+        if processed:
+            pipe.sadd(_processed_key(), *processed)
+        pipe.execute()
+        if tasks:
+            log.info("Pushed %d tasks to Redis queue", len(tasks))
+
     def run_once(self):
         if self.check_kill_switch():
             return
         
         # Read from Google Docs
-        doc_id = os.getenv("GOOGLE_DOC_ID") or CFG.get("google_doc_id")
+        doc_id = os.getenv("GOOGLE_DOC_ID") or get_cfg().get("google_doc_id")
         commands = self.google_client.read_doc(doc_id)
+        last = self._last_commands
+        if commands == last:
+            return
+        # The queue doc is normally append-only: only walk the new tail
+        if commands[:len(last)] == last:
+            new_lines = commands[len(last):]
+        else:
+            new_lines = commands
         
-        for line in commands:
-            if line in self.processed:
+        # One round trip tells which lines an earlier tick (or run) already handled
+        hashes = [_hash(line) for line in new_lines]
+        seen = r.smismember(_processed_key(), hashes) if hashes else []
+
+        pending: List[Dict] = []
+        handled: List[str] = []
+        handled_set = set()
+        for line, h, was_seen in zip(new_lines, hashes, seen):
+            if was_seen or h in handled_set:
                 continue
             task = self.validate(line)
             if not task:
                 continue
-            self.execute_command(task)
-            self.processed.add(line)
+            self.execute_command(task, pending)
+            handled.append(h)
+            handled_set.add(h)
+
+        # If this fails nothing is marked, so the next tick retries the lines
+        self.push_many(pending, handled)
+        self._last_commands = commands
+
+    def wait_for_wake(self) -> bool:
+        """Block until the next poll is due; True if woken early via Redis"""
+        cfg = get_cfg()
+        wake_key = cfg.get("wake_key", "agentkit:poll_wake")
+        interval = cfg.get("interval_seconds", 5)
+        if r.blpop(wake_key, timeout=interval) is None:
+            return False
+        # Coalesce a burst of wake-ups into a single poll
+        r.delete(wake_key)
+        return True
 
     def run_forever(self):
         log.info("Poller started with Google Docs integration (CTRL-C to stop)")
@@ -231,7 +457,8 @@ class Poller:
                     log.warning("Shutting down due to kill switch")
                     break
                 self.run_once()
-                time.sleep(5)
+                if self.wait_for_wake():
+                    log.info("Woken via Redis, polling now")
         except KeyboardInterrupt:
             log.info("Poller stopped")
 
@@ -5,35 +5,86 @@ Reads your real app list & services → picks best channel per post.
 Zero API keys in repo – ADC only.
 """
 import argparse
+import asyncio
+import atexit
+import collections
 import json
 import logging
 import os
 import sys
+import threading
 import time
 import hashlib
+import itertools
 import pathlib
+import queue
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
-from logging.handlers import RotatingFileHandler
-from typing import List, Dict, Optional
+from functools import cached_property, lru_cache
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Iterable, Iterator, List, Dict, Optional
 
-# Configure logging
+try:
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
+
+# Configure logging; file writes happen on a background listener thread
 LOG = logging.getLogger("AppsAgent")
 LOG.setLevel(logging.INFO)
+LOG.propagate = False  # has its own handlers; avoid re-emitting via root
 LOG.addHandler(logging.StreamHandler())
-LOG.addHandler(RotatingFileHandler(
-    "distribution.log", maxBytes=5*1024*1024, backupCount=5, encoding="utf-8"))
-
-# Track sent posts to avoid duplicates
-LEDGER = pathlib.Path("sent.json")
-SENT_CACHE = set(json.loads(LEDGER.read_text()) if LEDGER.exists() else "[]")
+_LOG_QUEUE = queue.Queue(-1)
+LOG.addHandler(QueueHandler(_LOG_QUEUE))
+_LOG_LISTENER = QueueListener(
+    _LOG_QUEUE,
+    RotatingFileHandler(
+        "distribution.log", maxBytes=5*1024*1024, backupCount=5, encoding="utf-8"),
+    respect_handler_level=True,
+)
+_LOG_LISTENER.start()
+atexit.register(_LOG_LISTENER.stop)
+
+# Maximum number of posts in flight at once
+AGENT_CONCURRENCY = int(os.getenv("AGENT_CONCURRENCY", "10"))
+# Post files read in parallel ahead of the consumer in directory mode
+READ_AHEAD = 8
+
+# Track sent posts to avoid duplicates: one post id per line, append-only
+LEDGER = pathlib.Path("sent.log")
+_LEGACY_LEDGER = pathlib.Path("sent.json")
+
+def _load_ledger() -> set:
+    """Read sent post ids from the append-only log (and the old JSON ledger)."""
+    sent = set()
+    if _LEGACY_LEDGER.exists():
+        sent.update(json.loads(_LEGACY_LEDGER.read_text()))
+    if LEDGER.exists():
+        with LEDGER.open(encoding="utf-8") as f:
+            sent.update(line.strip() for line in f if line.strip())
+    return sent
+
+SENT_CACHE = _load_ledger()
 
 @dataclass
 class Post:
     text: str
     media: List[pathlib.Path]
+    # Ledger key derived from the source file's stat, when read from disk
+    file_key: Optional[str] = None
+
+    @cached_property
+    def post_id(self) -> str:
+        """Content hash used as the ledger key; computed once per post."""
+        return hashlib.sha256(self.text.encode()).hexdigest()[:16]
 
+@lru_cache(maxsize=1)
 def _google_creds() -> tuple:
-    """Fetch Google Application Default Credentials (ADC)."""
+    """Fetch Google Application Default Credentials (ADC), once per process.
+
+    The credentials refresh their own token when it expires, and reusing
+    the same object keeps the per-creds _svc and _google_session caches warm.
+    """
     import google.auth
     creds, project = google.auth.default(
         scopes=[
@@ -46,42 +97,96 @@ def _google_creds() -> tuple:
     )
     return creds, project
 
-def _discover_services(creds) -> Dict[str, bool]:
-    """Detect which Google services are available and accessible."""
-    from googleapiclient.discovery import build
-    services = {}
-
-    # Check Gmail
-    try:
-        gmail = build("gmail", "v1", credentials=creds)
-        gmail.users().getProfile(userId="me").execute()
-        services["Gmail"] = True
-    except Exception:
-        services["Gmail"] = False
-
-    # Check Google Business Profile
+_SVC_LOCAL = threading.local()
+
+def _svc(api: str, version: str, creds):
+    """Return a cached discovery client for this thread.
+
+    googleapiclient handles wrap a non-thread-safe httplib2 connection, so
+    each worker thread keeps its own; build() then runs once per thread
+    instead of once per post.
+    """
+    cache = getattr(_SVC_LOCAL, "services", None)
+    if cache is None:
+        cache = _SVC_LOCAL.services = {}
+    key = (api, version, id(creds))
+    service = cache.get(key)
+    if service is None:
+        from googleapiclient.discovery import build
+        service = build(api, version, credentials=creds, cache_discovery=False)
+        cache[key] = service
+    return service
+
+def _probe_gmail(creds) -> bool:
+    gmail = _svc("gmail", "v1", creds)
+    gmail.users().getProfile(userId="me").execute()
+    return True
+
+def _probe_google_business(creds) -> bool:
+    gbp = _svc("mybusinessbusinessinformation", "v1", creds)
+    accounts = gbp.accounts().list().execute()
+    return bool(accounts.get("accounts"))
+
+def _probe_youtube(creds) -> bool:
+    yt = _svc("youtube", "v3", creds)
+    yt.channels().list(mine=True, part="id").execute()
+    return True
+
+def _probe_calendar(creds) -> bool:
+    cal = _svc("calendar", "v3", creds)
+    cal.calendarList().list(maxResults=1).execute()
+    return True
+
+_SERVICE_PROBES = {
+    "Gmail": _probe_gmail,
+    "GoogleBusiness": _probe_google_business,
+    "YouTube": _probe_youtube,
+    "Calendar": _probe_calendar,
+}
+
+SERVICES_CACHE = pathlib.Path.home() / ".cache" / "agentkit" / "services.json"
+SERVICES_CACHE_TTL = 24 * 3600
+
+def _probe(probe, creds) -> Optional[bool]:
+    """Run one service probe; None if it errored rather than answered"""
     try:
-        gbp = build("mybusinessbusinessinformation", "v1", credentials=creds)
-        accounts = gbp.accounts().list().execute()
-        services["GoogleBusiness"] = bool(accounts.get("accounts"))
-    except Exception:
-        services["GoogleBusiness"] = False
+        return probe(creds)
+    except Exception as e:
+        # An API refusing the account is an answer; anything else may be transient
+        if getattr(getattr(e, "resp", None), "status", None) in (403, 404):
+            return False
+        LOG.warning("Google service probe %s failed: %s", probe.__name__, e)
+        return None
 
-    # Check YouTube
-    try:
-        yt = build("youtube", "v3", credentials=creds)
-        yt.channels().list(mine=True, part="id").execute()
-        services["YouTube"] = True
-    except Exception:
-        services["YouTube"] = False
+def _discover_services(creds) -> Dict[str, bool]:
+    """Detect which Google services are available and accessible.
 
-    # Check Calendar
+    Results are cached on disk for SERVICES_CACHE_TTL seconds per account,
+    and on a miss the four probes run concurrently. A probe that errors
+    counts as unavailable for this run only; the results aren't cached.
+    """
+    account = getattr(creds, "service_account_email", None) or "default"
     try:
-        cal = build("calendar", "v3", credentials=creds)
-        cal.calendarList().list(maxResults=1).execute()
-        services["Calendar"] = True
-    except Exception:
-        services["Calendar"] = False
+        if time.time() - SERVICES_CACHE.stat().st_mtime < SERVICES_CACHE_TTL:
+            cached = json.loads(SERVICES_CACHE.read_text())
+            if cached.get("account") == account:
+                LOG.info("Using cached Google services: %s",
+                         [k for k, v in cached["services"].items() if v])
+                return cached["services"]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    with ThreadPoolExecutor(max_workers=len(_SERVICE_PROBES)) as ex:
+        futures = {name: ex.submit(_probe, probe, creds) for name, probe in _SERVICE_PROBES.items()}
+        results = {name: fut.result() for name, fut in futures.items()}
+    services = {name: bool(ok) for name, ok in results.items()}
+
+    if None not in results.values():
+        try:
+            SERVICES_CACHE.parent.mkdir(parents=True, exist_ok=True)
+            SERVICES_CACHE.write_text(json.dumps({"account": account, "services": services}))
+        except OSError as e:
+            LOG.warning("Could not cache discovered services: %s", e)
 
     LOG.info("Discovered Google services: %s", [k for k, v in services.items() if v])
     return services
@@ -98,39 +203,50 @@ def _choose_channel(services: Dict[str, bool], post: Post) -> str:
         return "Gmail"
     return "AyrShare"  # Fallback
 
+_GOOGLE_SESSIONS: Dict[int, object] = {}
+_GOOGLE_SESSIONS_LOCK = threading.Lock()
+
+def _google_session(creds):
+    """Shared keep-alive HTTP session that attaches and refreshes ADC tokens."""
+    session = _GOOGLE_SESSIONS.get(id(creds))
+    if session is None:
+        from google.auth.transport.requests import AuthorizedSession
+        with _GOOGLE_SESSIONS_LOCK:
+            session = _GOOGLE_SESSIONS.get(id(creds))
+            if session is None:
+                session = _GOOGLE_SESSIONS[id(creds)] = AuthorizedSession(creds)
+    return session
+
+GMAIL_SEND_URL = "https://gmail.googleapis.com/gmail/v1/users/me/messages/send"
+
 def _send_gmail(creds, post: Post) -> str:
-    """Post to Gmail."""
-    from googleapiclient.discovery import build
+    """Post to Gmail (raw REST call over a pooled session)."""
     from email.mime.text import MIMEText
     import base64
 
-    gmail = build("gmail", "v1", credentials=creds)
     msg = MIMEText(post.text)
     msg["To"] = os.getenv("FALLBACK_EMAIL", "user@example.com")
     msg["From"] = "agent@example.com"
     msg["Subject"] = "Agent Update"
     raw = base64.urlsafe_b64encode(msg.as_bytes()).decode()
-    result = gmail.users().messages().send(userId="me", body={"raw": raw}).execute()
-    return f"gmail-{result['id']}"
+    response = _google_session(creds).post(GMAIL_SEND_URL, json={"raw": raw}, timeout=10)
+    response.raise_for_status()
+    return f"gmail-{_loads(response.content)['id']}"
 
 def _send_google_business(creds, post: Post) -> str:
     """Post to Google Business Profile."""
-    from googleapiclient.discovery import build
-
-    gbp = build("mybusinessbusinessinformation", "v1", credentials=creds)
+    gbp = _svc("mybusinessbusinessinformation", "v1", creds)
     accounts = gbp.accounts().list().execute()
     location = accounts["accounts"][0]["name"]
 
-    posts_service = build("mybusinessbusinessposts", "v1", credentials=creds)
+    posts_service = _svc("mybusinessbusinessposts", "v1", creds)
     body = {"summary": post.text[:1500], "topicType": "STANDARD"}
     result = posts_service.locations().localPosts().create(parent=location, body=body).execute()
     return f"gbp-{result['name']}"
 
 def _send_youtube(creds, post: Post) -> str:
     """Post to YouTube (as a community post)."""
-    from googleapiclient.discovery import build
-
-    yt = build("youtube", "v3", credentials=creds)
+    yt = _svc("youtube", "v3", creds)
     body = {
         "snippet": {
             "type": "upload",
@@ -143,16 +259,60 @@ def _send_youtube(creds, post: Post) -> str:
 
 def _send_calendar(creds, post: Post) -> str:
     """Add an event to Google Calendar."""
-    from googleapiclient.discovery import build
-
-    cal = build("calendar", "v3", credentials=creds)
+    cal = _svc("calendar", "v3", creds)
     result = cal.events().quickAdd(calendarId="primary", text=post.text).execute()
     return f"cal-{result['id']}"
 
+# Channel name -> sender for the Google channels chosen by _choose_channel
+CHANNEL_SENDERS = {
+    "Gmail": _send_gmail,
+    "GoogleBusiness": _send_google_business,
+    "YouTube": _send_youtube,
+    "Calendar": _send_calendar,
+}
+
+@lru_cache(maxsize=4)
+def _ayrshare_key(project: str) -> str:
+    """AyrShare API key from Secret Manager, fetched once per project.
+
+    Failures raise and are not cached, so a later call retries.
+    """
+    from google.cloud import secretmanager
+    client = secretmanager.SecretManagerServiceClient()
+    return client.access_secret_version(
+        request={"name": f"projects/{project}/secrets/ayrshare-api-key/versions/latest"}
+    ).payload.data.decode("UTF-8")
+
+_AYR_SESSIONS: Dict[str, object] = {}
+_AYR_SESSIONS_LOCK = threading.Lock()
+
+def _ayrshare_session(api_key: str):
+    """Return a shared AyrShare HTTP session so TLS connections are reused."""
+    session = _AYR_SESSIONS.get(api_key)
+    if session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        # Sends run on worker threads; build the session (and its pool) only once
+        with _AYR_SESSIONS_LOCK:
+            session = _AYR_SESSIONS.get(api_key)
+            if session is None:
+                session = requests.Session()
+                # Pool sized for the concurrent sends in _distribute_async
+                session.mount("https://", HTTPAdapter(
+                    pool_connections=4,
+                    pool_maxsize=AGENT_CONCURRENCY,
+                    # Connection failures only: a POST that reached AyrShare may already be
+                    # published, so read errors and 429/5xx responses are never retried
+                    max_retries=Retry(connect=3, read=0, other=0, backoff_factor=0.2),
+                ))
+                session.headers["Authorization"] = f"Bearer {api_key}"
+                _AYR_SESSIONS[api_key] = session
+    return session
+
 def _send_ayrshare(api_key: str, post: Post, platforms: Optional[Dict[str, bool]] = None) -> str:
     """Fallback: Post via AyrShare."""
-    import requests
-
     if platforms:
         enabled_platforms = [
             platform.lower() for platform, enabled in platforms.items()
@@ -168,42 +328,167 @@ def _send_ayrshare(api_key: str, post: Post, platforms: Optional[Dict[str, bool]
     if post.media:
         payload["mediaUrls"] = [str(m) for m in post.media]
 
-    response = requests.post(
+    response = _ayrshare_session(api_key).post(
         "https://app.ayrshare.com/api/post",
-        headers={"Authorization": f"Bearer {api_key}"},
-        json=payload
+        json=payload,
+        timeout=10
     )
     response.raise_for_status()
-    return f"ayr-{response.json().get('id', 'ok')}"
+    return f"ayr-{_loads(response.content).get('id', 'ok')}"
 
-def load_content(source: str) -> List[Post]:
-    """Load posts from a file or directory."""
+def _read_post(path: str) -> Optional[Post]:
+    """Read a single .txt post and its sibling media directory."""
+    try:
+        txt_file = pathlib.Path(path)
+        media = [
+            m for m in txt_file.with_suffix("").glob("*")
+            if m.suffix.lower() in (".jpg", ".jpeg", ".png", ".mp4")
+        ]
+        return Post(text=txt_file.read_text(encoding="utf-8"), media=media)
+    except Exception as e:
+        LOG.error("Failed to read %s: %s", path, e)
+        return None
+
+def _post_entries(src: pathlib.Path) -> List[os.DirEntry]:
+    """The .txt posts in a content directory, in name order."""
+    with os.scandir(src) as it:
+        entries = [e for e in it if e.name.endswith(".txt") and e.is_file()]
+    entries.sort(key=lambda e: e.name)
+    return entries
+
+def _file_key(name: str, st: os.stat_result) -> str:
+    """Cheap identity for a content file, usable before reading it."""
+    key = f"{name}:{st.st_mtime_ns}:{st.st_size}"
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+def iter_content(source: str, skip_sent: bool = True) -> Iterator[Post]:
+    """Yield posts from a file or directory, reading them on demand.
+
+    In directory mode up to READ_AHEAD files are read in parallel ahead of
+    the consumer. With ``skip_sent``, files whose stat-derived key is
+    already in the ledger are skipped without being read.
+    """
     src = pathlib.Path(source)
     if not src.exists():
         LOG.error("Source %s not found", source)
-        return []
+        return
 
     if src.is_file():
-        return [Post(text=src.read_text(encoding="utf-8"), media=[])]
+        file_key = _file_key(src.name, src.stat())
+        if skip_sent and file_key in SENT_CACHE:
+            LOG.info("Skipping already-sent file: %s", src.name)
+            return
+        yield Post(text=src.read_text(encoding="utf-8"), media=[], file_key=file_key)
+        return
+
+    pending = []
+    for entry in _post_entries(src):
+        file_key = _file_key(entry.name, entry.stat())
+        if skip_sent and file_key in SENT_CACHE:
+            LOG.info("Skipping already-sent file: %s", entry.name)
+            continue
+        pending.append((entry.path, file_key))
+    if not pending:
+        return
+
+    # Blocking reads and media globs of the next files overlap with the
+    # consumer's work on this one; the window keeps memory bounded
+    queued = iter(pending)
+    with ThreadPoolExecutor(max_workers=min(READ_AHEAD, len(pending))) as pool:
+        reads = collections.deque(
+            (pool.submit(_read_post, path), file_key)
+            for path, file_key in itertools.islice(queued, READ_AHEAD)
+        )
+        while reads:
+            future, file_key = reads.popleft()
+            for path, next_key in itertools.islice(queued, 1):
+                reads.append((pool.submit(_read_post, path), next_key))
+            post = future.result()
+            if post is not None:
+                post.file_key = file_key
+                yield post
 
-    # Directory mode: Load all .txt files and associated media
-    posts = []
-    for txt_file in sorted(src.glob("*.txt")):
-        media = [
-            m for m in txt_file.with_suffix("").glob("*")
-            if m.suffix.lower() in (".jpg", ".jpeg", ".png", ".mp4")
-        ]
-        posts.append(Post(
-            text=txt_file.read_text(encoding="utf-8"),
-            media=media
-        ))
-    LOG.info("Loaded %d posts from %s", len(posts), src)
+def load_content(source: str) -> List[Post]:
+    """Load every post from a file or directory, sent or not."""
+    posts = list(iter_content(source, skip_sent=False))
+    LOG.info("Loaded %d posts from %s", len(posts), source)
     return posts
 
-def _update_ledger(post_id: str) -> None:
+def _update_ledger(*post_ids: str) -> None:
     """Track sent posts to avoid duplicates."""
-    SENT_CACHE.add(post_id)
-    LEDGER.write_text(json.dumps(list(SENT_CACHE)))
+    new_ids = [p for p in post_ids if p and p not in SENT_CACHE]
+    if not new_ids:
+        return
+    SENT_CACHE.update(new_ids)
+    with LEDGER.open("a", encoding="utf-8") as f:
+        f.write("".join(p + "\n" for p in new_ids))
+
+def _distribute_one(creds, services: Dict[str, bool], ayr_key: str, post: Post) -> None:
+    """Send a single post to its best channel (blocking)."""
+    channel = _choose_channel(services, post)
+    LOG.info("Selected channel: %s for post: %s", channel, post.text[:50])
+
+    try:
+        sender = CHANNEL_SENDERS.get(channel)
+        if sender is not None:
+            url = sender(creds, post)
+        else:  # Fallback to AyrShare
+            if not ayr_key:
+                raise RuntimeError("No AyrShare key and no suitable Google channel")
+            url = _send_ayrshare(ayr_key, post)
+        LOG.info("✅ Posted to %s: %s", channel, url)
+    except Exception as e:
+        LOG.error("❌ Failed to post to %s: %s", channel, e)
+
+def _size_thread_pool(workers: int) -> None:
+    """Run the current event loop's to_thread() calls on ``workers`` threads.
+
+    The loop's default executor is capped at min(32, cpu + 4) threads, so on
+    a small container it would quietly hold sends below AGENT_CONCURRENCY.
+    asyncio.run() shuts the pool down when the loop closes.
+    """
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=workers))
+
+async def _distribute_async(creds, services: Dict[str, bool], ayr_key: str,
+                            posts: Iterable[Post], concurrency: int = AGENT_CONCURRENCY) -> None:
+    """Fan posts out concurrently so network round-trips overlap.
+
+    Posts are pulled from ``posts`` only when a send slot is free, so a
+    lazy source such as iter_content() is read while earlier posts are
+    still in flight and at most ``concurrency`` posts are held in memory.
+    """
+    sem = asyncio.Semaphore(concurrency)
+    # One thread per send slot, plus one for the producer's next() calls
+    _size_thread_pool(concurrency + 1)
+
+    async def _send(post_id: str, post: Post) -> None:
+        try:
+            await asyncio.to_thread(_distribute_one, creds, services, ayr_key, post)
+        finally:
+            sem.release()
+        # Runs on the event loop thread, so ledger writes stay serialized
+        _update_ledger(post_id, post.file_key)
+
+    it = iter(posts)
+    seen = set()
+    tasks = []
+    while True:
+        await sem.acquire()
+        post = await asyncio.to_thread(next, it, None)
+        if post is None:
+            sem.release()
+            break
+        post_id = post.post_id
+        if post_id in SENT_CACHE or post_id in seen:
+            LOG.info("Skipping duplicate post: %s", post_id)
+            # Remember the file too, so the next run skips it unread
+            _update_ledger(post.file_key)
+            sem.release()
+            continue
+        seen.add(post_id)
+        tasks.append(asyncio.create_task(_send(post_id, post)))
+
+    await asyncio.gather(*tasks)
 
 def main():
     parser = argparse.ArgumentParser(description="Google-Apps-Aware Distribution Agent")
@@ -214,11 +499,17 @@ def main():
     # Initialize Google credentials
     creds, project = _google_creds()
 
-    # Load posts
-    posts = load_content(args.content)
-    if not posts:
+    # Load posts lazily; peek so an empty source still fails fast
+    posts = iter_content(args.content)
+    first = next(posts, None)
+    if first is None:
+        # Re-running on a source whose posts were all sent before is not an error
+        if pathlib.Path(args.content).exists() and next(iter_content(args.content, skip_sent=False), None):
+            LOG.info("Nothing new to distribute: every post in %s was already sent", args.content)
+            return
         LOG.error("No content to distribute")
         sys.exit(1)
+    posts = itertools.chain([first], posts)
 
     # Discover available services
     services = _discover_services(creds)
@@ -226,43 +517,13 @@ def main():
     # Fetch AyrShare key (fallback)
     ayr_key = ""
     try:
-        from google.cloud import secretmanager
-        client = secretmanager.SecretManagerServiceClient()
-        ayr_key = client.access_secret_version(
-            request={"name": f"projects/{project}/secrets/ayrshare-api-key/versions/latest"}
-        ).payload.data.decode("UTF-8")
+        ayr_key = _ayrshare_key(project)
         LOG.info("AyrShare fallback enabled")
     except Exception as e:
         LOG.warning("AyrShare key not found: %s", e)
 
     # Distribute posts
-    for post in posts:
-        post_id = hashlib.sha256(post.text.encode()).hexdigest()[:16]
-        if post_id in SENT_CACHE:
-            LOG.info("Skipping duplicate post: %s", post_id)
-            continue
-
-        channel = _choose_channel(services, post)
-        LOG.info("Selected channel: %s for post: %s", channel, post.text[:50])
-
-        try:
-            if channel == "Gmail":
-                url = _send_gmail(creds, post)
-            elif channel == "GoogleBusiness":
-                url = _send_google_business(creds, post)
-            elif channel == "YouTube":
-                url = _send_youtube(creds, post)
-            elif channel == "Calendar":
-                url = _send_calendar(creds, post)
-            else:  # Fallback to AyrShare
-                if not ayr_key:
-                    raise RuntimeError("No AyrShare key and no suitable Google channel")
-                url = _send_ayrshare(ayr_key, post)
-            LOG.info("✅ Posted to %s: %s", channel, url)
-        except Exception as e:
-            LOG.error("❌ Failed to post to %s: %s", channel, e)
-
-        _update_ledger(post_id)
+    asyncio.run(_distribute_async(creds, services, ayr_key, posts))
 
     LOG.info("Distribution complete. Logs: distribution.log")
 
@@ -3,25 +3,35 @@
 Report generation agent that creates real PDF and Excel reports.
 """
 import os
+import csv
 import json
+import importlib.util
 import redis
 import logging
+import socket
 import pandas as pd
+from functools import lru_cache
+from itertools import islice
+from concurrent.futures import CancelledError, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
 from pathlib import Path
 from datetime import datetime
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
+from reportlab.lib.pagesizes import A4
+from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable, TableStyle
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
 from reportlab.lib import colors
-from reportlab.graphics.shapes import Drawing
-from reportlab.graphics.charts.linecharts import HorizontalLineChart
-from reportlab.graphics.charts.barcharts import VerticalBarChart
-from jinja2 import Template
-import matplotlib.pyplot as plt
-import seaborn as sns
-from io import BytesIO
-import base64
+
+try:
+    import orjson
+
+    _loads = orjson.loads
+    _dumps = orjson.dumps
+except ImportError:
+    _loads = json.loads
+
+    def _dumps(obj) -> bytes:
+        return json.dumps(obj).encode()
 
 logging.basicConfig(
     level=logging.INFO,
@@ -29,55 +39,201 @@ logging.basicConfig(
 )
 log = logging.getLogger("report_generator")
 
+# xlsxwriter is much faster than openpyxl for write-only workbooks
+EXCEL_ENGINE = 'xlsxwriter' if importlib.util.find_spec('xlsxwriter') else 'openpyxl'
+
 # ---------- Redis ----------
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-r = redis.from_url(REDIS_URL, decode_responses=True)
+# Shared by the blocking claim loop, result pipelines and input fetches; keepalive stops
+# the idle blocking connection being dropped between bursts
+pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=64,
+    decode_responses=True,
+    socket_keepalive=True,
+    health_check_interval=30,
+)
+r = redis.Redis(connection_pool=pool)
+
+# Each task type has its own list, so agents only ever pop their own work
+TASK_QUEUE = "agent_tasks"
+
+def _task_queue(task_type: str) -> str:
+    return f"{TASK_QUEUE}:{task_type}"
+
+REPORT_QUEUE = _task_queue("PUBLISH_REPORT")
+# Claimed tasks stay here until their results are stored, so a crash mid-batch
+# doesn't lose them; named per worker so replicas don't requeue each other's work
+REPORT_INFLIGHT = f"{REPORT_QUEUE}:inflight:{os.getenv('REPORTER_ID', socket.gethostname())}"
+# How long to block on REPORT_QUEUE before checking the legacy shared list
+LEGACY_POLL_SECONDS = 5
+
+# Tasks drained per wake-up; their result writes share one pipeline round trip
+REPORT_BATCH = int(os.getenv("REPORT_BATCH", "8"))
+# Processes rendering a batch's reports in parallel
+REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", os.cpu_count() or 1))
+# Longest wait for one report before its worker is treated as hung
+REPORT_TIMEOUT_SECONDS = int(os.getenv("REPORT_TIMEOUT_SECONDS", "300"))
+# SCAN batch hint; most keys here are result blobs, so a small page already holds enough matches
+SCAN_COUNT = 64
+# Written by site_scanner alongside each scan_result:<id>
+RECENT_SCANS_KEY = "recent_scan_results"
+
+# Nested scan-result fields -> flat report column, with the default for missing values
+SCAN_FIELDS = {
+    'domain': ('domain', ''),
+    'scan_time': ('scan_time', ''),
+    'basic_info.status_code': ('status_code', ''),
+    'performance.load_times.full_page': ('load_time_ms', 0),
+    'security.score': ('security_score', 0),
+    'seo.score': ('seo_score', 0),
+}
+EXCEL_SCAN_COLUMNS = {
+    'domain': 'Domain',
+    'scan_time': 'Scan Time',
+    'status_code': 'Status Code',
+    'load_time_ms': 'Load Time (ms)',
+    'security_score': 'Security Score',
+    'seo_score': 'SEO Score',
+    'vulnerability_count': 'Vulnerabilities',
+    'technology_count': 'Technologies',
+}
+# CSV columns; scan and distribution columns are only included when those rows exist
+CSV_FIELDS = ['type', 'client', 'dataset', 'timestamp']
+CSV_SCAN_FIELDS = ['domain', 'status_code', 'load_time_ms', 'security_score', 'seo_score',
+                   'vulnerability_count', 'technology_count']
+CSV_DIST_FIELDS = ['distribution_id', 'platforms_total', 'platforms_success', 'platforms_failed']
+
+@lru_cache(maxsize=None)
+def _path_parts(path: str) -> tuple:
+    return tuple(path.split('.'))
+
+def _lookup(obj: dict, path: str, default):
+    """Walk a dotted path through nested dicts, returning default on any miss"""
+    for part in _path_parts(path):
+        if not isinstance(obj, dict) or part not in obj:
+            return default
+        obj = obj[part]
+    return default if obj is None else obj
+
+def _scan_row(scan: dict) -> dict:
+    """One scan result as a flat dict keyed by report column"""
+    row = {name: _lookup(scan, path, default) for path, (name, default) in SCAN_FIELDS.items()}
+    row['vulnerability_count'] = len(scan.get('vulnerabilities') or [])
+    row['technology_count'] = len(scan.get('technologies') or [])
+    return row
+
+# Exact per-platform statuses; anything else falls back to a substring check
+SUCCESS_STATUSES = frozenset({'success', 'ok', 'sent'})
+FAIL_STATUSES = frozenset({'fail', 'failed', 'error'})
+
+def _count_status(dist: dict) -> tuple:
+    """Count (succeeded, failed) platforms of one distribution result in a single pass"""
+    success = fail = 0
+    for p in dist.values():
+        status = p.get('status', '') if isinstance(p, dict) else p
+        if status in SUCCESS_STATUSES:
+            success += 1
+        elif status in FAIL_STATUSES:
+            fail += 1
+        elif isinstance(status, str):
+            # Free-form messages such as "success: posted" or "failed: 401"
+            success += 'success' in status
+            fail += 'fail' in status
+    return success, fail
+
+def _table_style(header_bg, body_bg, header_font_size: int) -> TableStyle:
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), header_bg),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), header_font_size),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), body_bg),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
 
 class ReportGenerator:
+    # Styles are immutable once built, so share them across reports
+    styles = getSampleStyleSheet()
+    normal_style = styles['Normal']
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Title'],
+        fontSize=24,
+        spaceAfter=30,
+        textColor=colors.darkblue
+    )
+    
+    heading_style = ParagraphStyle(
+        'CustomHeading',
+        parent=styles['Heading1'],
+        fontSize=16,
+        spaceAfter=12,
+        textColor=colors.darkblue
+    )
+    
+    perf_table_style = _table_style(colors.grey, colors.beige, 14)
+    sec_table_style = _table_style(colors.darkblue, colors.lightblue, 14)
+    scan_table_style = _table_style(colors.grey, colors.lightgrey, 12)
+    
     def __init__(self):
         self.reports_dir = Path("reports")
         self.reports_dir.mkdir(exist_ok=True)
-        self.styles = getSampleStyleSheet()
-        
-        # Custom styles
-        self.title_style = ParagraphStyle(
-            'CustomTitle',
-            parent=self.styles['Title'],
-            fontSize=24,
-            spaceAfter=30,
-            textColor=colors.darkblue
-        )
-        
-        self.heading_style = ParagraphStyle(
-            'CustomHeading',
-            parent=self.styles['Heading1'],
-            fontSize=16,
-            spaceAfter=12,
-            textColor=colors.darkblue
-        )
+        self._pool = None
     
-    def generate_report(self, client: str, dataset: str, format_type: str) -> str:
+    def generate_report(self, client: str, dataset: str, format_type: str,
+                        now: Optional[datetime] = None) -> str:
         """Generate a comprehensive report"""
         log.info("Generating %s report for client: %s, dataset: %s", format_type, client, dataset)
         
+        # One clock reading so the filename and report contents agree
+        now = now or datetime.now()
+        
         # Gather data from Redis and create sample dataset
-        report_data = self._gather_report_data(client, dataset)
+        report_data = self._gather_report_data(client, dataset, now)
         
         if format_type.lower() == 'pdf':
-            return self._generate_pdf_report(client, dataset, report_data)
+            return self._generate_pdf_report(client, dataset, report_data, now)
         elif format_type.lower() == 'csv':
-            return self._generate_csv_report(client, dataset, report_data)
+            return self._generate_csv_report(client, dataset, report_data, now)
         elif format_type.lower() == 'excel':
-            return self._generate_excel_report(client, dataset, report_data)
+            return self._generate_excel_report(client, dataset, report_data, now)
         else:
             raise ValueError(f"Unsupported format: {format_type}")
     
-    def _gather_report_data(self, client: str, dataset: str) -> dict:
+    def _load_results(self, pattern: str, limit: int, index: Optional[str] = None) -> list:
+        """Fetch up to ``limit`` JSON blobs matching ``pattern`` in two round-trips"""
+        keys = []
+        if index:
+            # Newest ids first; the producer prunes entries past the result TTL
+            prefix = pattern.rstrip('*')
+            keys = [prefix + i for i in r.zrevrange(index, 0, limit - 1)]
+        if not keys:
+            # SCAN walks the keyspace incrementally instead of blocking Redis like KEYS
+            keys = list(islice(r.scan_iter(match=pattern, count=SCAN_COUNT), limit))
+        if not keys:
+            return []
+        
+        results = []
+        for raw in r.mget(keys):
+            if raw is None:  # expired since it was listed
+                continue
+            try:
+                results.append(_loads(raw))
+            except ValueError:
+                continue
+        return results
+    
+    def _gather_report_data(self, client: str, dataset: str, now: Optional[datetime] = None) -> dict:
         """Gather data for the report from various sources"""
+        now = now or datetime.now()
         data = {
             'client': client,
             'dataset': dataset,
-            'generated_at': datetime.now().isoformat(),
+            'generated_at': now.isoformat(),
             'scan_results': [],
             'distribution_results': [],
             'performance_metrics': {},
@@ -85,22 +241,10 @@ class ReportGenerator:
         }
         
         # Gather scan results from Redis
-        scan_keys = r.keys('scan_result:*')
-        for key in scan_keys[:10]:  # Limit to last 10 scans
-            try:
-                scan_data = json.loads(r.get(key))
-                data['scan_results'].append(scan_data)
-            except:
-                continue
+        data['scan_results'] = self._load_results('scan_result:*', 10, index=RECENT_SCANS_KEY)  # Limit to 10 scans
         
         # Gather distribution results
-        dist_keys = r.keys('distribution_result:*')
-        for key in dist_keys[:20]:  # Limit to last 20 distributions
-            try:
-                dist_data = json.loads(r.get(key))
-                data['distribution_results'].append(dist_data)
-            except:
-                continue
+        data['distribution_results'] = self._load_results('distribution_result:*', 20)  # Limit to 20 distributions
         
         # Generate performance metrics
         if data['scan_results']:
@@ -108,13 +252,14 @@ class ReportGenerator:
             security_scores = []
             
             for scan in data['scan_results']:
-                perf = scan.get('performance', {})
-                if 'load_times' in perf:
-                    load_times.append(perf['load_times'].get('full_page', 0))
-                
-                security = scan.get('security', {})
-                if 'score' in security:
-                    security_scores.append(security['score'])
+                # Failed scans leave sections missing or null; they don't count towards the metrics
+                load_time = _lookup(scan, 'performance.load_times.full_page', None)
+                if load_time is not None:
+                    load_times.append(load_time)
+
+                security_score = _lookup(scan, 'security.score', None)
+                if security_score is not None:
+                    security_scores.append(security_score)
             
             if load_times:
                 data['performance_metrics'] = {
@@ -133,9 +278,11 @@ class ReportGenerator:
         
         return data
     
-    def _generate_pdf_report(self, client: str, dataset: str, data: dict) -> str:
+    def _generate_pdf_report(self, client: str, dataset: str, data: dict,
+                             now: Optional[datetime] = None) -> str:
         """Generate a comprehensive PDF report"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = now or datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         filename = f"report_{client}_{dataset}_{timestamp}.pdf"
         filepath = self.reports_dir / filename
         
@@ -152,7 +299,7 @@ class ReportGenerator:
         story.append(Paragraph("Executive Summary", self.heading_style))
         summary_text = f"""
         This report provides a comprehensive analysis of the {dataset} dataset for {client}.
-        Generated on {datetime.now().strftime('%B %d, %Y at %I:%M %p')}.
+        Generated on {now.strftime('%B %d, %Y at %I:%M %p')}.
         
         Key Findings:
         • Total scans performed: {len(data.get('scan_results', []))}
@@ -160,7 +307,7 @@ class ReportGenerator:
         • Average security score: {data.get('summary_stats', {}).get('avg_security_score', 'N/A')}
         • Average load time: {data.get('performance_metrics', {}).get('avg_load_time', 'N/A')} ms
         """
-        story.append(Paragraph(summary_text, self.styles['Normal']))
+        story.append(Paragraph(summary_text, self.normal_style))
         story.append(Spacer(1, 20))
         
         # Performance Metrics
@@ -176,16 +323,7 @@ class ReportGenerator:
             ]
             
             perf_table = Table(perf_data)
-            perf_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            perf_table.setStyle(self.perf_table_style)
             
             story.append(perf_table)
             story.append(Spacer(1, 20))
@@ -202,16 +340,7 @@ class ReportGenerator:
             ]
             
             sec_table = Table(sec_data)
-            sec_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.darkblue),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 14),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightblue),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            sec_table.setStyle(self.sec_table_style)
             
             story.append(sec_table)
             story.append(Spacer(1, 20))
@@ -222,24 +351,15 @@ class ReportGenerator:
             
             scan_data = [['Domain', 'Status', 'Load Time (ms)', 'Security Score']]
             for scan in data['scan_results'][:5]:  # Show last 5 scans
-                domain = scan.get('domain', 'Unknown')
-                status = scan.get('basic_info', {}).get('status_code', 'N/A')
-                load_time = scan.get('performance', {}).get('load_times', {}).get('full_page', 0)
-                sec_score = scan.get('security', {}).get('score', 0)
+                domain = _lookup(scan, 'domain', 'Unknown')
+                status = _lookup(scan, 'basic_info.status_code', 'N/A')
+                load_time = _lookup(scan, 'performance.load_times.full_page', 0)
+                sec_score = _lookup(scan, 'security.score', 0)
                 
                 scan_data.append([domain, str(status), f"{load_time:.0f}", f"{sec_score}/100"])
             
-            scan_table = Table(scan_data)
-            scan_table.setStyle(TableStyle([
-                ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-                ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-                ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-                ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-                ('FONTSIZE', (0, 0), (-1, 0), 12),
-                ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-                ('BACKGROUND', (0, 1), (-1, -1), colors.lightgrey),
-                ('GRID', (0, 0), (-1, -1), 1, colors.black)
-            ]))
+            scan_table = LongTable(scan_data, repeatRows=1, splitByRow=1)
+            scan_table.setStyle(self.scan_table_style)
             
             story.append(scan_table)
         
@@ -249,65 +369,55 @@ class ReportGenerator:
         log.info("PDF report generated: %s", filepath)
         return str(filepath)
     
-    def _generate_csv_report(self, client: str, dataset: str, data: dict) -> str:
+    def _generate_csv_report(self, client: str, dataset: str, data: dict,
+                             now: Optional[datetime] = None) -> str:
         """Generate CSV report with structured data"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = now or datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         filename = f"report_{client}_{dataset}_{timestamp}.csv"
         filepath = self.reports_dir / filename
         
-        # Prepare data for CSV
-        csv_data = []
-        
-        # Add scan results
-        for scan in data.get('scan_results', []):
-            row = {
-                'type': 'scan',
-                'client': client,
-                'dataset': dataset,
-                'timestamp': scan.get('scan_time', ''),
-                'domain': scan.get('domain', ''),
-                'status_code': scan.get('basic_info', {}).get('status_code', ''),
-                'load_time_ms': scan.get('performance', {}).get('load_times', {}).get('full_page', 0),
-                'security_score': scan.get('security', {}).get('score', 0),
-                'seo_score': scan.get('seo', {}).get('score', 0),
-                'vulnerability_count': len(scan.get('vulnerabilities', [])),
-                'technology_count': len(scan.get('technologies', []))
-            }
-            csv_data.append(row)
-        
-        # Add distribution results
-        for i, dist in enumerate(data.get('distribution_results', [])):
-            row = {
-                'type': 'distribution',
-                'client': client,
-                'dataset': dataset,
-                'timestamp': datetime.now().isoformat(),
-                'distribution_id': i,
-                'platforms_total': len(dist),
-                'platforms_success': len([p for p in dist.values() if 'success' in p]),
-                'platforms_failed': len([p for p in dist.values() if 'fail' in p])
-            }
-            csv_data.append(row)
+        scans = data.get('scan_results', [])
+        dists = data.get('distribution_results', [])
+        fields = CSV_FIELDS + (CSV_SCAN_FIELDS if scans else []) + (CSV_DIST_FIELDS if dists else [])
         
-        # Create DataFrame and save
-        if csv_data:
-            df = pd.DataFrame(csv_data)
-            df.to_csv(filepath, index=False)
-        else:
-            # Create empty CSV with headers
-            df = pd.DataFrame(columns=['type', 'client', 'dataset', 'timestamp'])
-            df.to_csv(filepath, index=False)
+        with open(filepath, 'w', newline='') as f:
+            # '\n' rows, as pandas' to_csv wrote them
+            writer = csv.DictWriter(f, fieldnames=fields, lineterminator='\n')
+            writer.writeheader()
+            
+            # Add scan results
+            for scan in scans:
+                row = _scan_row(scan)
+                row['timestamp'] = row.pop('scan_time')
+                writer.writerow({'type': 'scan', 'client': client, 'dataset': dataset, **row})
+            
+            # Add distribution results
+            for i, dist in enumerate(dists):
+                success, fail = _count_status(dist)
+                writer.writerow({
+                    'type': 'distribution',
+                    'client': client,
+                    'dataset': dataset,
+                    'timestamp': now.isoformat(),
+                    'distribution_id': i,
+                    'platforms_total': len(dist),
+                    'platforms_success': success,
+                    'platforms_failed': fail
+                })
         
         log.info("CSV report generated: %s", filepath)
         return str(filepath)
     
-    def _generate_excel_report(self, client: str, dataset: str, data: dict) -> str:
+    def _generate_excel_report(self, client: str, dataset: str, data: dict,
+                               now: Optional[datetime] = None) -> str:
         """Generate Excel report with multiple sheets"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        now = now or datetime.now()
+        timestamp = now.strftime("%Y%m%d_%H%M%S")
         filename = f"report_{client}_{dataset}_{timestamp}.xlsx"
         filepath = self.reports_dir / filename
         
-        with pd.ExcelWriter(filepath, engine='openpyxl') as writer:
+        with pd.ExcelWriter(filepath, engine=EXCEL_ENGINE) as writer:
             # Summary sheet
             summary_data = {
                 'Metric': ['Total Scans', 'Total Distributions', 'Average Security Score', 'Average Load Time (ms)'],
@@ -323,33 +433,21 @@ class ReportGenerator:
             
             # Scan results sheet
             if data.get('scan_results'):
-                scan_records = []
-                for scan in data['scan_results']:
-                    record = {
-                        'Domain': scan.get('domain', ''),
-                        'Scan Time': scan.get('scan_time', ''),
-                        'Status Code': scan.get('basic_info', {}).get('status_code', ''),
-                        'Load Time (ms)': scan.get('performance', {}).get('load_times', {}).get('full_page', 0),
-                        'Security Score': scan.get('security', {}).get('score', 0),
-                        'SEO Score': scan.get('seo', {}).get('score', 0),
-                        'Vulnerabilities': len(scan.get('vulnerabilities', [])),
-                        'Technologies': len(scan.get('technologies', []))
-                    }
-                    scan_records.append(record)
-                
-                scan_df = pd.DataFrame(scan_records)
+                scan_df = pd.DataFrame([_scan_row(s) for s in data['scan_results']],
+                                       columns=list(EXCEL_SCAN_COLUMNS)).rename(columns=EXCEL_SCAN_COLUMNS)
                 scan_df.to_excel(writer, sheet_name='Scan Results', index=False)
             
             # Distribution results sheet
             if data.get('distribution_results'):
                 dist_records = []
                 for i, dist in enumerate(data['distribution_results']):
+                    success, fail = _count_status(dist)
                     record = {
                         'Distribution ID': i,
                         'Platforms Total': len(dist),
-                        'Platforms Success': len([p for p in dist.values() if 'success' in p]),
-                        'Platforms Failed': len([p for p in dist.values() if 'fail' in p]),
-                        'Success Rate': len([p for p in dist.values() if 'success' in p]) / len(dist) if dist else 0
+                        'Platforms Success': success,
+                        'Platforms Failed': fail,
+                        'Success Rate': success / len(dist) if dist else 0
                     }
                     dist_records.append(record)
                 
@@ -359,8 +457,8 @@ class ReportGenerator:
         log.info("Excel report generated: %s", filepath)
         return str(filepath)
     
-    def handle_report_task(self, task: dict) -> str:
-        """Handle a PUBLISH_REPORT task"""
+    def handle_report_task(self, task: dict, pipe=None) -> str:
+        """Handle a PUBLISH_REPORT task, queueing the result write on pipe if given"""
         client = task['params']['client']
         dataset = task['params']['dataset']
         format_type = task['params']['format']
@@ -368,20 +466,9 @@ class ReportGenerator:
         log.info("Generating %s report for %s - %s", format_type, client, dataset)
         
         try:
-            report_path = self.generate_report(client, dataset, format_type)
-            
-            # Store report info in Redis
-            report_info = {
-                'client': client,
-                'dataset': dataset,
-                'format': format_type,
-                'path': report_path,
-                'generated_at': datetime.now().isoformat(),
-                'file_size': os.path.getsize(report_path) if os.path.exists(report_path) else 0
-            }
-            
-            result_key = f"report_result:{task.get('id', 'unknown')}"
-            r.setex(result_key, 7200, json.dumps(report_info))  # Expire after 2 hours
+            now = datetime.now()
+            report_path = self.generate_report(client, dataset, format_type, now)
+            self._store_result(task, report_path, now, pipe)
             
             log.info("Report generated successfully: %s", report_path)
             return report_path
@@ -390,24 +477,157 @@ class ReportGenerator:
             log.error("Failed to generate report: %s", e)
             raise
     
+    def _store_result(self, task: dict, report_path: str, generated_at: datetime, pipe=None):
+        """Record a finished report's metadata under report_result:<task id>
+
+        ``generated_at`` is the clock reading the report itself was built with.
+        """
+        try:
+            file_size = os.stat(report_path).st_size
+        except FileNotFoundError:
+            file_size = 0
+        
+        # Store report info in Redis
+        report_info = {
+            'client': task['params']['client'],
+            'dataset': task['params']['dataset'],
+            'format': task['params']['format'],
+            'path': report_path,
+            'generated_at': generated_at.isoformat(),
+            'file_size': file_size
+        }
+        
+        result_key = f"report_result:{task.get('id', 'unknown')}"
+        (pipe or r).setex(result_key, 7200, _dumps(report_info))  # Expire after 2 hours
+    
+    @property
+    def pool(self) -> ProcessPoolExecutor:
+        # Created on first use so the one-shot CLI path never forks workers
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(max_workers=REPORT_WORKERS)
+        return self._pool
+    
+    def _discard_pool(self, pool: ProcessPoolExecutor, kill: bool = False):
+        """Drop a broken or stuck pool so the next access to self.pool builds a fresh one"""
+        if self._pool is not pool:
+            return  # already replaced by an earlier failure in this batch
+        self._pool = None
+        # shutdown() forgets the worker processes, so take them first
+        procs = list((pool._processes or {}).values()) if kill else []
+        pool.shutdown(wait=False, cancel_futures=True)
+        # A hung render never returns on its own; ProcessPoolExecutor only
+        # gained a public terminate_workers() in Python 3.14
+        for proc in procs:
+            proc.terminate()
+    
+    def _next_batch(self) -> list:
+        """Atomically move up to REPORT_BATCH tasks into REPORT_INFLIGHT and return them"""
+        raw = r.blmove(REPORT_QUEUE, REPORT_INFLIGHT, LEGACY_POLL_SECONDS, "RIGHT", "LEFT")
+        if raw is None:
+            # The shared list is still drained for producers that predate per-type queues
+            raw = r.lmove(TASK_QUEUE, REPORT_INFLIGHT, "RIGHT", "LEFT")
+            if raw is None:
+                return []
+        
+        # Top the batch up in one round trip; moves past the end of the list return None
+        pipe = r.pipeline(transaction=False)
+        for _ in range(REPORT_BATCH - 1):
+            pipe.lmove(REPORT_QUEUE, REPORT_INFLIGHT, "RIGHT", "LEFT")
+        return [raw] + [task for task in pipe.execute() if task is not None]
+    
+    def _requeue_inflight(self):
+        """Put back tasks a previous run of this worker took but never finished"""
+        count = 0
+        while r.lmove(REPORT_INFLIGHT, REPORT_QUEUE, "LEFT", "RIGHT") is not None:
+            count += 1
+        if count:
+            log.warning("Requeued %d unfinished report tasks", count)
+    
     def loop(self):
         """Main loop to process report generation tasks"""
         log.info("Report generator waiting for PUBLISH_REPORT tasks...")
+        self._requeue_inflight()
         
         while True:
             try:
-                _, raw = r.brpop("agent_tasks")
-                task = json.loads(raw)
-                
-                if task.get("type") == "PUBLISH_REPORT":
-                    self.handle_report_task(task)
-                else:
-                    # Put non-report tasks back for other agents
-                    r.lpush("agent_tasks", raw)
-                    
+                batch = self._next_batch()
+                if not batch:
+                    continue
             except Exception as e:
                 log.error("Error processing report task: %s", e)
                 continue
+            
+            pipe = r.pipeline(transaction=False)
+            jobs = []
+            # Tasks a dead worker pool never rendered; they go back on REPORT_QUEUE
+            retry = []
+            for raw in batch:
+                try:
+                    task = _loads(raw)
+                    
+                    if task.get("type") == "PUBLISH_REPORT":
+                        params = task['params']
+                        log.info("Generating %s report for %s - %s",
+                                 params['format'], params['client'], params['dataset'])
+                        # Rendering is CPU-bound, so the batch is built in parallel worker processes
+                        pool = self.pool
+                        try:
+                            future = pool.submit(_generate_report_worker, params['client'],
+                                                 params['dataset'], params['format'])
+                        except BrokenProcessPool as e:
+                            log.error("Report worker pool is broken, rebuilding it: %s", e)
+                            self._discard_pool(pool)
+                            retry.append(raw)
+                            continue
+                        jobs.append((raw, task, pool, future))
+                    elif task.get("type"):
+                        # Hand non-report tasks to their own queue rather than back onto the shared one
+                        pipe.lpush(_task_queue(task["type"]), raw)
+                    else:
+                        log.warning("Dropping task without a type: %s", raw)
+                        
+                except Exception as e:
+                    log.error("Error processing report task: %s", e)
+            
+            for raw, task, pool, future in jobs:
+                try:
+                    report_path, generated_at = future.result(timeout=REPORT_TIMEOUT_SECONDS)
+                    self._store_result(task, report_path, generated_at, pipe)
+                    log.info("Report generated successfully: %s", report_path)
+                except FuturesTimeout:
+                    log.error("Report task %s still running after %d s, stopping its workers",
+                              task.get('id'), REPORT_TIMEOUT_SECONDS)
+                    self._discard_pool(pool, kill=True)
+                except (BrokenProcessPool, CancelledError) as e:
+                    # A worker crashed or was killed: the pool can't be reused,
+                    # and the task may never have been rendered
+                    log.error("Report worker pool failed on task %s, requeueing it: %s",
+                              task.get('id'), e or type(e).__name__)
+                    self._discard_pool(pool)
+                    retry.append(raw)
+                except Exception as e:
+                    log.error("Failed to generate report: %s", e)
+            
+            # Cleared in the same round trip as the results, so a task leaves
+            # REPORT_INFLIGHT only once its outcome is stored
+            for raw in batch:
+                if raw in retry:
+                    retry.remove(raw)
+                    pipe.lpush(REPORT_QUEUE, raw)
+                pipe.lrem(REPORT_INFLIGHT, 1, raw)
+            
+            try:
+                pipe.execute()
+            except Exception as e:
+                log.error("Error storing report results: %s", e)
+
+def _generate_report_worker(client: str, dataset: str, format_type: str) -> tuple:
+    """Process-pool entry point: build one report in a worker process.
+
+    Returns the report path and the time the report was generated at.
+    """
+    now = datetime.now()
+    return ReportGenerator().generate_report(client, dataset, format_type, now), now
 
 if __name__ == "__main__":
     import argparse
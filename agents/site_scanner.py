@@ -4,18 +4,26 @@ Site scanning agent that performs real security and performance analysis.
 """
 import os
 import json
+import hashlib
 import redis
 import logging
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
-from selenium import webdriver
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.common.by import By
+from selectolax.lexbor import LexborHTMLParser
 import time
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
 import ssl
 import socket
 from datetime import datetime, timedelta
+from typing import Tuple
+
+try:
+    from orjson import dumps as _dumps, loads as _loads
+except ImportError:
+    from json import dumps as _dumps, loads as _loads
 
 logging.basicConfig(
     level=logging.INFO,
@@ -25,32 +33,126 @@ log = logging.getLogger("site_scanner")
 
 # ---------- Redis ----------
 REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
-r = redis.from_url(REDIS_URL, decode_responses=True)
+# Keepalive + health checks stop the idle BLMOVE connection being dropped between scans
+pool = redis.ConnectionPool.from_url(
+    REDIS_URL,
+    max_connections=16,
+    decode_responses=True,
+    socket_keepalive=True,
+    health_check_interval=30,
+)
+r = redis.Redis(connection_pool=pool)
+
+# Each task type has its own list, so agents only ever pop their own work
+TASK_QUEUE = "agent_tasks"
+
+def _task_queue(task_type: str) -> str:
+    return f"{TASK_QUEUE}:{task_type}"
+
+SCAN_QUEUE = _task_queue("SCAN_SITE")
+# Tasks this worker has taken but not finished; requeued on restart after a crash
+SCAN_INFLIGHT = f"{SCAN_QUEUE}:inflight:{os.getenv('SCANNER_ID', socket.gethostname())}"
+# How long to block on SCAN_QUEUE before checking the legacy shared list
+LEGACY_POLL_SECONDS = 5
+
+SCAN_RESULT_TTL = 3600  # seconds
+# Sorted set of scan task ids by completion time, so readers need not SCAN for results
+RECENT_SCANS_KEY = "recent_scan_results"
+RECENT_SCANS_MAX = 1000
+
+# Repeat scans of a domain within this window reuse the last result
+SCAN_CACHE_TTL = 300  # seconds
+
+# Certificates change every few months, so one handshake per host covers many scans
+CERT_CACHE_TTL = 6 * 3600  # seconds
+CERT_CACHE_MAX = 1024
+
+# Bodies beyond this are not downloaded, so a huge or endless response can't exhaust memory
+MAX_PAGE_BYTES = 10 * 1024 * 1024
+# Total time for reading a body; the per-read timeout alone lets a server trickle forever
+MAX_PAGE_SECONDS = 60
+# An index page's "Index of" heading sits at the top, so the probe needs only a little
+LISTING_PROBE_BYTES = 8 * 1024
+LISTING_PROBE_SECONDS = 10
+# Decoded bytes taken per read while streaming a body
+BODY_CHUNK_BYTES = 64 * 1024
+
+# Analyzer lookups, built once rather than per scan
+STYLESHEET_SELECTOR = 'link[rel~="stylesheet"]'
+META_SELECTORS = {
+    'description': 'meta[name="description"]',
+    'keywords': 'meta[name="keywords"]',
+}
+HEADING_TAGS = tuple(f'h{i}' for i in range(1, 7))
+OUTDATED_SERVERS = ('apache/2.2', 'nginx/1.0', 'iis/6.0')
+
+def _normalize_domain(domain: str) -> str:
+    if not domain.startswith(('http://', 'https://')):
+        domain = f"https://{domain}"
+    return domain
+
+def _scan_cache_key(domain: str) -> str:
+    digest = hashlib.blake2b(_normalize_domain(domain).encode(), digest_size=16).hexdigest()
+    return f"scan_cache:{digest}"
+
+def _parse_html(response: requests.Response, body: bytes) -> LexborHTMLParser:
+    """Parse a response body with lexbor's C HTML5 parser"""
+    declared = response.encoding if 'charset=' in response.headers.get('content-type', '').lower() else None
+    if declared and declared.lower().replace('-', '') not in ('utf8', 'ascii', 'usascii'):
+        # lexbor reads bytes as UTF-8, so decode other declared charsets first
+        try:
+            return LexborHTMLParser(body.decode(declared, errors='replace'))
+        except LookupError:  # unknown charset name
+            return LexborHTMLParser(body.decode('utf-8', errors='replace'))
+    return LexborHTMLParser(body)
 
 class SiteScanner:
     def __init__(self):
         self.session = requests.Session()
         self.session.headers.update({
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 AgentKit Site Scanner'
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 AgentKit Site Scanner',
+            'Connection': 'keep-alive'
         })
+        # Keep-alive pool so the page fetch and follow-up probes share connections
+        adapter = HTTPAdapter(
+            pool_connections=32,
+            pool_maxsize=32,
+            # raise_on_status=False: report the site's final 5xx instead of a RetryError
+            max_retries=Retry(total=2, backoff_factor=0.3,
+                              status_forcelist=[502, 503, 504], raise_on_status=False),
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
         
-        # Setup headless Chrome for dynamic analysis
-        chrome_options = Options()
-        chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--no-sandbox")
-        chrome_options.add_argument("--disable-dev-shm-usage")
-        chrome_options.add_argument("--disable-gpu")
+        # Headless Chrome is only started when dynamic analysis asks for it
+        self.driver = None
         
-        try:
-            self.driver = webdriver.Chrome(options=chrome_options)
-        except Exception as e:
-            log.warning("Chrome driver not available, skipping dynamic analysis: %s", e)
-            self.driver = None
+        # Runs the network probes that can overlap with the main page fetch
+        self._probe_pool = ThreadPoolExecutor(max_workers=2)
+        
+        self._ssl_context = ssl.create_default_context()
+        self._cert_cache = {}  # (hostname, port) -> (expires_at, ssl_info)
+    
+    def _ensure_driver(self):
+        """Start headless Chrome on first use; None if it isn't available"""
+        if self.driver is None:
+            try:
+                from selenium import webdriver
+                from selenium.webdriver.chrome.options import Options
+                
+                chrome_options = Options()
+                chrome_options.add_argument("--headless")
+                chrome_options.add_argument("--no-sandbox")
+                chrome_options.add_argument("--disable-dev-shm-usage")
+                chrome_options.add_argument("--disable-gpu")
+                self.driver = webdriver.Chrome(options=chrome_options)
+            except Exception as e:
+                log.warning("Chrome driver not available, skipping dynamic analysis: %s", e)
+        return self.driver
     
     def scan_domain(self, domain: str) -> dict:
         """Perform comprehensive domain analysis"""
-        if not domain.startswith(('http://', 'https://')):
-            domain = f"https://{domain}"
+        domain = _normalize_domain(domain)
         
         results = {
             'domain': domain,
@@ -63,42 +165,104 @@ class SiteScanner:
             'vulnerabilities': []
         }
         
+        # The TLS handshake and /wp-admin/ probe don't depend on the page, so overlap them with it
+        ssl_future = self._probe_pool.submit(self._fetch_ssl_info, domain)
+        listing_future = self._probe_pool.submit(self._has_directory_listing, domain)
+        
         try:
+            # Fetch and parse the page once; every analyzer works from the same copy
+            start_time = time.time()
+            response, body = self._fetch_page(domain)
+            load_time = (time.time() - start_time) * 1000
+            tree = _parse_html(response, body)
+            
             # Basic HTTP analysis
-            results['basic_info'] = self._analyze_http(domain)
+            results['basic_info'] = self._analyze_http(response, body)
             
             # Security analysis
-            results['security'] = self._analyze_security(domain)
+            results['security'] = self._analyze_security(response, ssl_future)
             
             # Performance analysis
-            results['performance'] = self._analyze_performance(domain)
+            results['performance'] = self._analyze_performance(body, tree, load_time)
             
             # SEO analysis
-            results['seo'] = self._analyze_seo(domain)
+            results['seo'] = self._analyze_seo(tree)
             
             # Technology detection
-            results['technologies'] = self._detect_technologies(domain)
+            results['technologies'] = self._detect_technologies(response, body)
             
             # Vulnerability scanning
-            results['vulnerabilities'] = self._scan_vulnerabilities(domain)
+            results['vulnerabilities'] = self._scan_vulnerabilities(response, listing_future)
             
         except Exception as e:
             log.error("Error scanning domain %s: %s", domain, e)
             results['error'] = str(e)
+            self._collect_probes(results, ssl_future, listing_future)
         
         return results
     
-    def _analyze_http(self, domain: str) -> dict:
+    def _collect_probes(self, results: dict, ssl_future: Future, listing_future: Future):
+        """Keep the page-independent probe results when the page analysis failed"""
+        if not results['security']:
+            try:
+                ssl_info = ssl_future.result()
+                results['security'] = {'ssl_info': ssl_info, 'security_headers': {},
+                                       'score': 10 if ssl_info else 0}
+            except Exception as e:
+                results['security'] = {'ssl_info': {}, 'security_headers': {}, 'score': 0,
+                                       'error': str(e)}
+        if not results['vulnerabilities']:
+            vulnerability = self._listing_vulnerability(listing_future)
+            if vulnerability:
+                results['vulnerabilities'].append(vulnerability)
+    
+    def _get_capped(self, url: str, limit: int, max_seconds: float,
+                    **kwargs) -> Tuple[requests.Response, bytes]:
+        """GET url, keeping at most limit decoded body bytes read within max_seconds"""
+        body = bytearray()
+        with self.session.get(url, stream=True, **kwargs) as response:
+            # A read blocks until its chunk fills, so checking the clock between
+            # chunks can't stop a trickle; shutdown() interrupts the read instead
+            expired = threading.Event()
+            
+            def expire():
+                expired.set()
+                response.raw.shutdown()
+            
+            timer = threading.Timer(max_seconds, expire)
+            timer.start()
+            try:
+                for chunk in response.iter_content(BODY_CHUNK_BYTES):
+                    body += chunk
+                    if len(body) >= limit:
+                        del body[limit:]
+                        break
+            except (requests.RequestException, OSError):
+                if not expired.is_set():
+                    raise
+            finally:
+                timer.cancel()
+            if expired.is_set():
+                log.warning("Stopped reading %s after %s s", url, max_seconds)
+        return response, bytes(body)
+    
+    def _fetch_page(self, domain: str) -> Tuple[requests.Response, bytes]:
+        """GET the page, keeping at most MAX_PAGE_BYTES of the body"""
+        response, body = self._get_capped(domain, MAX_PAGE_BYTES, MAX_PAGE_SECONDS,
+                                          timeout=30, allow_redirects=True)
+        if len(body) >= MAX_PAGE_BYTES:
+            log.warning("Page body of %s truncated at %d bytes", domain, MAX_PAGE_BYTES)
+        return response, body
+    
+    def _analyze_http(self, response: requests.Response, body: bytes) -> dict:
         """Basic HTTP response analysis"""
         try:
-            response = self.session.get(domain, timeout=10, allow_redirects=True)
-            
             return {
                 'status_code': response.status_code,
                 'final_url': response.url,
                 'redirects': len(response.history),
                 'response_time_ms': int(response.elapsed.total_seconds() * 1000),
-                'content_length': len(response.content),
+                'content_length': len(body),
                 'content_type': response.headers.get('content-type', ''),
                 'server': response.headers.get('server', ''),
                 'headers': dict(response.headers)
@@ -106,7 +270,41 @@ class SiteScanner:
         except Exception as e:
             return {'error': str(e)}
     
-    def _analyze_security(self, domain: str) -> dict:
+    def _fetch_ssl_info(self, domain: str) -> dict:
+        """Read the site's TLS certificate; empty for plain-HTTP sites"""
+        parsed = urlparse(domain)
+        if parsed.scheme != 'https':
+            return {}
+        
+        key = (parsed.hostname, parsed.port or 443)
+        now = time.monotonic()
+        cached = self._cert_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+        
+        ssl_info = self._get_cert(*key)
+        self._cert_cache.pop(key, None)  # re-insert expired entries as newest
+        if len(self._cert_cache) >= CERT_CACHE_MAX:
+            self._cert_cache.pop(next(iter(self._cert_cache)))  # oldest entry
+        self._cert_cache[key] = (now + CERT_CACHE_TTL, ssl_info)
+        return ssl_info
+    
+    def _get_cert(self, hostname: str, port: int) -> dict:
+        """TLS handshake with the host and summarise its peer certificate"""
+        with socket.create_connection((hostname, port), timeout=10) as sock:
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            with self._ssl_context.wrap_socket(sock, server_hostname=hostname) as ssock:
+                cert = ssock.getpeercert()
+                return {
+                    'subject': dict(x[0] for x in cert['subject']),
+                    'issuer': dict(x[0] for x in cert['issuer']),
+                    'not_after': cert['notAfter'],
+                    'not_before': cert['notBefore'],
+                    'serial_number': cert['serialNumber'],
+                    'version': cert['version']
+                }
+    
+    def _analyze_security(self, response: requests.Response, ssl_future: Future) -> dict:
         """Security header and SSL analysis"""
         security_info = {
             'ssl_info': {},
@@ -116,26 +314,9 @@ class SiteScanner:
         
         try:
             # SSL Certificate Analysis
-            parsed = urlparse(domain)
-            hostname = parsed.hostname
-            port = parsed.port or (443 if parsed.scheme == 'https' else 80)
-            
-            if parsed.scheme == 'https':
-                context = ssl.create_default_context()
-                with socket.create_connection((hostname, port), timeout=10) as sock:
-                    with context.wrap_socket(sock, server_hostname=hostname) as ssock:
-                        cert = ssock.getpeercert()
-                        security_info['ssl_info'] = {
-                            'subject': dict(x[0] for x in cert['subject']),
-                            'issuer': dict(x[0] for x in cert['issuer']),
-                            'not_after': cert['notAfter'],
-                            'not_before': cert['notBefore'],
-                            'serial_number': cert['serialNumber'],
-                            'version': cert['version']
-                        }
+            security_info['ssl_info'] = ssl_future.result()
             
             # Security Headers Analysis
-            response = self.session.get(domain, timeout=10)
             headers = response.headers
             
             security_headers = {
@@ -173,7 +354,8 @@ class SiteScanner:
         
         return security_info
     
-    def _analyze_performance(self, domain: str) -> dict:
+    def _analyze_performance(self, body: bytes, tree: LexborHTMLParser,
+                             load_time: float) -> dict:
         """Performance analysis"""
         perf_info = {
             'load_times': {},
@@ -183,21 +365,15 @@ class SiteScanner:
         
         try:
             # Basic load time
-            start_time = time.time()
-            response = self.session.get(domain, timeout=30)
-            load_time = (time.time() - start_time) * 1000
-            
             perf_info['load_times']['full_page'] = load_time
             
             # Analyze page size and resources
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            images = soup.find_all('img')
-            scripts = soup.find_all('script')
-            stylesheets = soup.find_all('link', rel='stylesheet')
+            images = tree.css('img')
+            scripts = tree.css('script')
+            stylesheets = tree.css(STYLESHEET_SELECTOR)
             
             perf_info['resource_analysis'] = {
-                'html_size': len(response.content),
+                'html_size': len(body),
                 'image_count': len(images),
                 'script_count': len(scripts),
                 'stylesheet_count': len(stylesheets)
@@ -216,7 +392,7 @@ class SiteScanner:
         
         return perf_info
     
-    def _analyze_seo(self, domain: str) -> dict:
+    def _analyze_seo(self, tree: LexborHTMLParser) -> dict:
         """SEO analysis"""
         seo_info = {
             'meta_tags': {},
@@ -226,39 +402,35 @@ class SiteScanner:
         }
         
         try:
-            response = self.session.get(domain, timeout=10)
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
             # Meta tags analysis
-            title = soup.find('title')
-            description = soup.find('meta', attrs={'name': 'description'})
-            keywords = soup.find('meta', attrs={'name': 'keywords'})
+            title = tree.css_first('title')
+            description = tree.css_first(META_SELECTORS['description'])
+            keywords = tree.css_first(META_SELECTORS['keywords'])
+            title_text = title.text() if title is not None else None
+            description_text = description.attributes.get('content') if description is not None else None
             
             seo_info['meta_tags'] = {
-                'title': title.text if title else None,
-                'title_length': len(title.text) if title else 0,
-                'description': description.get('content') if description else None,
-                'description_length': len(description.get('content', '')) if description else 0,
-                'keywords': keywords.get('content') if keywords else None
+                'title': title_text,
+                'title_length': len(title_text) if title_text is not None else 0,
+                'description': description_text,
+                'description_length': len(description_text or ''),
+                'keywords': keywords.attributes.get('content') if keywords is not None else None
             }
             
             # Heading structure analysis
-            headings = {}
-            for i in range(1, 7):
-                h_tags = soup.find_all(f'h{i}')
-                headings[f'h{i}'] = len(h_tags)
+            headings = {tag: len(tree.css(tag)) for tag in HEADING_TAGS}
             
             seo_info['headings'] = headings
             
             # SEO issues detection
-            if not title:
+            if title is None:
                 seo_info['issues'].append('Missing title tag')
-            elif len(title.text) > 60:
+            elif len(title_text) > 60:
                 seo_info['issues'].append('Title tag too long')
             
-            if not description:
+            if description is None:
                 seo_info['issues'].append('Missing meta description')
-            elif len(description.get('content', '')) > 160:
+            elif len(description_text or '') > 160:
                 seo_info['issues'].append('Meta description too long')
             
             if headings['h1'] == 0:
@@ -276,14 +448,13 @@ class SiteScanner:
         
         return seo_info
     
-    def _detect_technologies(self, domain: str) -> list:
+    def _detect_technologies(self, response: requests.Response, body: bytes) -> list:
         """Detect technologies used by the website"""
         technologies = []
         
         try:
-            response = self.session.get(domain, timeout=10)
             headers = response.headers
-            content = response.text.lower()
+            content = body.lower()
             
             # Server detection
             server = headers.get('Server', '')
@@ -295,23 +466,23 @@ class SiteScanner:
                 technologies.append({'name': 'Powered By', 'value': headers['x-powered-by']})
             
             # Content Management System detection
-            if 'wp-content' in content or 'wordpress' in content:
+            if b'wp-content' in content or b'wordpress' in content:
                 technologies.append({'name': 'CMS', 'value': 'WordPress'})
-            elif 'drupal' in content:
+            elif b'drupal' in content:
                 technologies.append({'name': 'CMS', 'value': 'Drupal'})
-            elif 'joomla' in content:
+            elif b'joomla' in content:
                 technologies.append({'name': 'CMS', 'value': 'Joomla'})
             
             # JavaScript frameworks
-            if 'react' in content:
+            if b'react' in content:
                 technologies.append({'name': 'JavaScript Framework', 'value': 'React'})
-            elif 'angular' in content:
+            elif b'angular' in content:
                 technologies.append({'name': 'JavaScript Framework', 'value': 'Angular'})
-            elif 'vue' in content:
+            elif b'vue' in content:
                 technologies.append({'name': 'JavaScript Framework', 'value': 'Vue.js'})
             
             # Analytics
-            if 'google-analytics' in content or 'gtag' in content:
+            if b'google-analytics' in content or b'gtag' in content:
                 technologies.append({'name': 'Analytics', 'value': 'Google Analytics'})
             
         except Exception as e:
@@ -319,17 +490,35 @@ class SiteScanner:
         
         return technologies
     
-    def _scan_vulnerabilities(self, domain: str) -> list:
+    def _has_directory_listing(self, domain: str) -> bool:
+        """Probe /wp-admin/ for an open directory index"""
+        _, body = self._get_capped(urljoin(domain, '/wp-admin/'), LISTING_PROBE_BYTES,
+                                   LISTING_PROBE_SECONDS, timeout=5)
+        return b'Index of' in body
+    
+    def _listing_vulnerability(self, listing_future: Future):
+        """The directory-listing finding, or None if the probe found none or failed"""
+        try:
+            if listing_future.result():
+                return {
+                    'severity': 'medium',
+                    'type': 'Directory Listing',
+                    'description': 'Directory listing is enabled'
+                }
+        except Exception:
+            pass
+        return None
+    
+    def _scan_vulnerabilities(self, response: requests.Response, listing_future: Future) -> list:
         """Basic vulnerability scanning"""
         vulnerabilities = []
         
         try:
-            response = self.session.get(domain, timeout=10)
             headers = response.headers
+            server_lower = headers.get('Server', '').lower()
             
             # Check for common security issues
-            if 'Server' in headers and any(old_server in headers['Server'].lower() 
-                                         for old_server in ['apache/2.2', 'nginx/1.0', 'iis/6.0']):
+            if any(old_server in server_lower for old_server in OUTDATED_SERVERS):
                 vulnerabilities.append({
                     'severity': 'medium',
                     'type': 'Outdated Server',
@@ -352,41 +541,52 @@ class SiteScanner:
                 })
             
             # Check for directory listing
-            try:
-                dir_response = self.session.get(urljoin(domain, '/wp-admin/'), timeout=5)
-                if 'Index of' in dir_response.text:
-                    vulnerabilities.append({
-                        'severity': 'medium',
-                        'type': 'Directory Listing',
-                        'description': 'Directory listing is enabled'
-                    })
-            except:
-                pass
+            vulnerability = self._listing_vulnerability(listing_future)
+            if vulnerability:
+                vulnerabilities.append(vulnerability)
             
         except Exception as e:
             log.error("Error scanning vulnerabilities: %s", e)
         
         return vulnerabilities
     
-    def handle_scan_task(self, task: dict):
-        """Handle a SCAN_SITE task"""
+    def handle_scan_task(self, task: dict, pipe=None):
+        """Handle a SCAN_SITE task, queueing the result writes on pipe if given"""
         domain = task['params']['domain']
-        log.info("Starting comprehensive scan of domain: %s", domain)
+        cache_key = _scan_cache_key(domain)
         
-        # Perform the scan
-        results = self.scan_domain(domain)
-        
-        # Store results in Redis
-        result_key = f"scan_result:{task.get('id', 'unknown')}"
-        r.setex(result_key, 3600, json.dumps(results, indent=2))  # Expire after 1 hour
+        cached = r.get(cache_key)
+        if cached:
+            log.info("Reusing scan of %s from the last %d seconds", domain, SCAN_CACHE_TTL)
+            payload = cached
+            results = _loads(cached)
+        else:
+            log.info("Starting comprehensive scan of domain: %s", domain)
+            
+            # Perform the scan
+            results = self.scan_domain(domain)
+            payload = _dumps(results)
         
         # Generate summary report
         summary = self._generate_summary(results)
         log.info("Scan complete for %s: %s", domain, summary)
         
-        # Store summary for quick access
-        summary_key = f"scan_summary:{task.get('id', 'unknown')}"
-        r.setex(summary_key, 3600, summary)
+        # Store results, summary and the recent-scans index in one round trip
+        task_id = task.get('id', 'unknown')
+        now = time.time()
+        own_pipe = pipe is None
+        if own_pipe:
+            pipe = r.pipeline(transaction=False)
+        pipe.setex(f"scan_result:{task_id}", SCAN_RESULT_TTL, payload)
+        if not cached and 'error' not in results:  # failed scans are retried, not cached
+            pipe.setex(cache_key, SCAN_CACHE_TTL, payload)
+        pipe.setex(f"scan_summary:{task_id}", SCAN_RESULT_TTL, summary)
+        pipe.zadd(RECENT_SCANS_KEY, {task_id: now})
+        # Drop index entries whose results have expired, and cap its size
+        pipe.zremrangebyscore(RECENT_SCANS_KEY, '-inf', now - SCAN_RESULT_TTL)
+        pipe.zremrangebyrank(RECENT_SCANS_KEY, 0, -(RECENT_SCANS_MAX + 1))
+        if own_pipe:
+            pipe.execute()
         
         return results
     
@@ -417,24 +617,58 @@ class SiteScanner:
             f"Vulnerabilities: {vuln_count}"
         )
     
+    def _next_task(self):
+        """Atomically move the next task into SCAN_INFLIGHT and return it, or None"""
+        raw = r.blmove(SCAN_QUEUE, SCAN_INFLIGHT, LEGACY_POLL_SECONDS, "RIGHT", "LEFT")
+        if raw is None:
+            # The shared list is still drained for producers that predate per-type queues
+            raw = r.lmove(TASK_QUEUE, SCAN_INFLIGHT, "RIGHT", "LEFT")
+        return raw
+    
+    def _requeue_inflight(self):
+        """Put back tasks a previous run of this worker took but never finished"""
+        count = 0
+        while r.lmove(SCAN_INFLIGHT, SCAN_QUEUE, "LEFT", "RIGHT") is not None:
+            count += 1
+        if count:
+            log.warning("Requeued %d unfinished scan tasks", count)
+    
     def loop(self):
         """Main loop to process scan tasks"""
         log.info("Site scanner waiting for SCAN_SITE tasks...")
+        self._requeue_inflight()
         
         while True:
             try:
-                _, raw = r.brpop("agent_tasks")
-                task = json.loads(raw)
+                raw = self._next_task()
+                if raw is None:
+                    continue
+            except Exception as e:
+                log.error("Error processing scan task: %s", e)
+                continue
+            
+            pipe = r.pipeline(transaction=False)
+            try:
+                task = _loads(raw)
                 
                 if task.get("type") == "SCAN_SITE":
-                    self.handle_scan_task(task)
+                    self.handle_scan_task(task, pipe)
+                elif task.get("type"):
+                    # Hand non-scan tasks to their own queue rather than back onto the shared one
+                    pipe.lpush(_task_queue(task["type"]), raw)
                 else:
-                    # Put non-scan tasks back for other agents
-                    r.lpush("agent_tasks", raw)
+                    log.warning("Dropping task without a type: %s", raw)
                     
             except Exception as e:
                 log.error("Error processing scan task: %s", e)
-                continue
+            
+            # Cleared in the same round trip as the results, so a task leaves
+            # SCAN_INFLIGHT only once its outcome is stored
+            pipe.lrem(SCAN_INFLIGHT, 1, raw)
+            try:
+                pipe.execute()
+            except Exception as e:
+                log.error("Error storing scan results: %s", e)
     
     def __del__(self):
         if hasattr(self, 'driver') and self.driver:
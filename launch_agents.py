@@ -9,10 +9,13 @@ import time
 import signal
 import logging
 import argparse
+import multiprocessing
 import subprocess
 from pathlib import Path
 from typing import List, Dict
+from threading import Thread
 from multiprocessing import Process
+from multiprocessing.connection import wait
 
 logging.basicConfig(
     level=logging.INFO,
@@ -20,6 +23,34 @@ logging.basicConfig(
 )
 log = logging.getLogger("launcher")
 
+# Imported once by the fork server so every agent process starts with them loaded
+FORKSERVER_PRELOAD = ['redis', 'requests', 'orjson', 'yaml', 'selectolax.lexbor']
+
+# An agent that keeps crashing is restarted at most this often
+MIN_RESTART_INTERVAL = 1.0  # seconds
+# Pause between starting agents; they don't depend on each other, so none by default
+START_STAGGER = float(os.getenv("AGENT_START_STAGGER", "0"))  # seconds
+
+def run_agent(name: str, module: str):
+    """Import an agent module and run its main loop"""
+    import importlib
+    agent_module = importlib.import_module(module)
+    # Run the agent's main loop
+    if hasattr(agent_module, 'main'):
+        agent_module.main()
+    elif name == 'command_poller':
+        from agents.command_poller import Poller
+        Poller().run_forever()
+    elif name == 'content_distribution':
+        from agents.content_distribution_agent import Distributor
+        Distributor().loop()
+    elif name == 'site_scanner':
+        from agents.site_scanner import SiteScanner
+        SiteScanner().loop()
+    elif name == 'report_generator':
+        from agents.report_generator import ReportGenerator
+        ReportGenerator().loop()
+
 class AgentLauncher:
     def __init__(self):
         self.agents = {
@@ -29,6 +60,9 @@ class AgentLauncher:
             'report_generator': 'agents.report_generator'
         }
         self.processes: Dict[str, Process] = {}
+        # Agents run as threads of the launcher in --single-process mode
+        self.threads: Dict[str, Thread] = {}
+        self.started_at: Dict[str, float] = {}
         self.shutdown = False
     
     def check_environment(self) -> bool:
@@ -93,28 +127,10 @@ class AgentLauncher:
         try:
             log.info("Starting %s agent...", name)
             
-            def run_agent():
-                import importlib
-                agent_module = importlib.import_module(module)
-                # Run the agent's main loop
-                if hasattr(agent_module, 'main'):
-                    agent_module.main()
-                elif name == 'command_poller':
-                    from agents.command_poller import Poller
-                    Poller().run_forever()
-                elif name == 'content_distribution':
-                    from agents.content_distribution_agent import Distributor
-                    Distributor().loop()
-                elif name == 'site_scanner':
-                    from agents.site_scanner import SiteScanner
-                    SiteScanner().loop()
-                elif name == 'report_generator':
-                    from agents.report_generator import ReportGenerator
-                    ReportGenerator().loop()
-            
-            process = Process(target=run_agent, name=f"agent-{name}")
+            process = Process(target=run_agent, args=(name, module), name=f"agent-{name}")
             process.start()
             self.processes[name] = process
+            self.started_at[name] = time.monotonic()
             
             log.info("✓ %s agent started (PID: %d)", name, process.pid)
             return True
@@ -123,6 +139,24 @@ class AgentLauncher:
             log.error("✗ Failed to start %s agent: %s", name, e)
             return False
     
+    def start_agent_thread(self, name: str, module: str) -> bool:
+        """Start a single agent as a thread of this process"""
+        try:
+            log.info("Starting %s agent in-process...", name)
+            
+            # Daemon: agent loops never return, so they must not block launcher exit
+            thread = Thread(target=run_agent, args=(name, module), name=f"agent-{name}", daemon=True)
+            thread.start()
+            self.threads[name] = thread
+            self.started_at[name] = time.monotonic()
+            
+            log.info("✓ %s agent started (thread: %s)", name, thread.name)
+            return True
+            
+        except Exception as e:
+            log.error("✗ Failed to start %s agent: %s", name, e)
+            return False
+    
     def stop_agent(self, name: str) -> bool:
         """Stop a single agent"""
         if name in self.processes:
@@ -144,8 +178,8 @@ class AgentLauncher:
         
         return False
     
-    def start_all(self, agents: List[str] = None) -> bool:
-        """Start all or specified agents"""
+    def start_all(self, agents: List[str] = None, single_process: bool = False) -> bool:
+        """Start all or specified agents, as processes or as threads of this one"""
         if not self.check_environment():
             log.error("Environment check failed. Please fix configuration and try again.")
             return False
@@ -154,12 +188,14 @@ class AgentLauncher:
         
         log.info("Starting AgentKit Phase-1 with %d agents...", len(agents_to_start))
         
+        start = self.start_agent_thread if single_process else self.start_agent
         success_count = 0
         for agent_name in agents_to_start:
             if agent_name in self.agents:
-                if self.start_agent(agent_name, self.agents[agent_name]):
+                if start(agent_name, self.agents[agent_name]):
                     success_count += 1
-                    time.sleep(1)  # Stagger startup
+                    if START_STAGGER:
+                        time.sleep(START_STAGGER)
             else:
                 log.error("Unknown agent: %s", agent_name)
         
@@ -172,6 +208,8 @@ class AgentLauncher:
         
         for name in list(self.processes.keys()):
             self.stop_agent(name)
+        # Threads can't be killed; as daemons they end with the launcher
+        self.threads.clear()
         
         log.info("All agents stopped")
     
@@ -179,7 +217,7 @@ class AgentLauncher:
         """Show status of all agents"""
         log.info("Agent Status:")
         
-        if not self.processes:
+        if not self.processes and not self.threads:
             log.info("  No agents running")
             return
         
@@ -187,6 +225,16 @@ class AgentLauncher:
             status = "RUNNING" if process.is_alive() else "STOPPED"
             pid = process.pid if process.is_alive() else "N/A"
             log.info("  %s: %s (PID: %s)", name.upper(), status, pid)
+        
+        for name, thread in self.threads.items():
+            status = "RUNNING" if thread.is_alive() else "STOPPED"
+            log.info("  %s: %s (thread: %s)", name.upper(), status, thread.name)
+    
+    def _restart_backoff(self, name: str):
+        """Sleep out the rest of MIN_RESTART_INTERVAL since the agent last started"""
+        delay = self.started_at.get(name, 0) + MIN_RESTART_INTERVAL - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
     
     def monitor(self):
         """Monitor agents and restart if they crash"""
@@ -204,10 +252,24 @@ class AgentLauncher:
                 for name, process in list(self.processes.items()):
                     if not process.is_alive():
                         log.warning("%s agent crashed, restarting...", name)
+                        self._restart_backoff(name)
                         del self.processes[name]
                         self.start_agent(name, self.agents[name])
                 
-                time.sleep(5)  # Check every 5 seconds
+                for name, thread in list(self.threads.items()):
+                    if not thread.is_alive():
+                        log.warning("%s agent crashed, restarting...", name)
+                        self._restart_backoff(name)
+                        del self.threads[name]
+                        self.start_agent_thread(name, self.agents[name])
+                
+                # Wakes as soon as any agent process exits; the timeout bounds how
+                # long thread crashes and shutdown signals wait to be noticed
+                sentinels = [p.sentinel for p in self.processes.values()]
+                if sentinels:
+                    wait(sentinels, timeout=1)
+                else:
+                    time.sleep(1)
                 
         except KeyboardInterrupt:
             log.info("Monitoring interrupted")
@@ -223,9 +285,17 @@ def main():
                        choices=['command_poller', 'content_distribution', 'site_scanner', 'report_generator'],
                        help='Specific agents to start (default: all)')
     parser.add_argument('--check-env', action='store_true', help='Only check environment')
+    parser.add_argument('--single-process', action='store_true',
+                       help='Run agents as threads of one process instead of one process each')
     
     args = parser.parse_args()
     
+    # Agents fork from a small server process rather than from the launcher, so they
+    # don't inherit its state and the preloaded modules are shared copy-on-write
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        multiprocessing.set_start_method('forkserver', force=True)
+        multiprocessing.set_forkserver_preload(FORKSERVER_PRELOAD)
+    
     launcher = AgentLauncher()
     
     if args.check_env:
@@ -233,7 +303,7 @@ def main():
         sys.exit(0 if success else 1)
     
     if args.command == 'start':
-        success = launcher.start_all(args.agents)
+        success = launcher.start_all(args.agents, single_process=args.single_process)
         if success:
             launcher.monitor()
         sys.exit(0 if success else 1)
@@ -245,7 +315,7 @@ def main():
         launcher.status()
     
     elif args.command == 'monitor':
-        if launcher.processes:
+        if launcher.processes or launcher.threads:
             launcher.monitor()
         else:
             log.error("No agents running. Start them first.")
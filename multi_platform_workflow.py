@@ -4,9 +4,11 @@ Automated Multi-Platform Workflow.
 Distributes content across all linked accounts.
 """
 import os
+import asyncio
 import pathlib
 import logging
-from agents.content_distribution_agent import Post, load_content, _choose_channel, _discover_services, _google_creds, _send_ayrshare, _send_google_business, _send_youtube, _send_calendar, _send_gmail
+from typing import Dict, List
+from agents.content_distribution_agent import AGENT_CONCURRENCY, CHANNEL_SENDERS, Post, load_content, _ayrshare_key, _choose_channel, _discover_services, _google_creds, _send_ayrshare, _size_thread_pool
 
 # Configure logging
 logging.basicConfig(
@@ -69,34 +71,42 @@ def distribute_to_platforms(content_dir):
     # Fetch AyrShare key (fallback)
     ayr_key = ""
     try:
-        from google.cloud import secretmanager
-        client = secretmanager.SecretManagerServiceClient()
-        ayr_key = client.access_secret_version(
-            request={"name": f"projects/{project}/secrets/ayrshare-api-key/versions/latest"}
-        ).payload.data.decode("UTF-8")
+        ayr_key = _ayrshare_key(project)
         LOG.info("AyrShare fallback enabled")
     except Exception as e:
         LOG.warning("AyrShare key not found: %s", e)
 
-    for post in posts:
-        # Select channel based on services and platform configuration
-        channel = _choose_channel(services, post)
+    asyncio.run(_dispatch_all(creds, services, ayr_key, posts))
 
-        # Post to selected channel
-        if channel == "GoogleBusiness":
-            _send_google_business(creds, post)
-        elif channel == "YouTube":
-            _send_youtube(creds, post)
-        elif channel == "Calendar":
-            _send_calendar(creds, post)
-        elif channel == "Gmail":
-            _send_gmail(creds, post)
+def _dispatch(creds, services: Dict[str, bool], ayr_key: str, post: Post) -> None:
+    """Send one post to its selected channel (blocking)."""
+    # Select channel based on services and platform configuration
+    channel = _choose_channel(services, post)
+
+    # Post to selected channel
+    sender = CHANNEL_SENDERS.get(channel)
+    if sender is not None:
+        sender(creds, post)
+    else:
+        # Fallback to AyrShare for non-Google platforms
+        if ayr_key:
+            _send_ayrshare(ayr_key, post, PLATFORMS)
         else:
-            # Fallback to AyrShare for non-Google platforms
-            if ayr_key:
-                _send_ayrshare(ayr_key, post, PLATFORMS)
-            else:
-                LOG.error("AyrShare API key not available.")
+            LOG.error("AyrShare API key not available.")
+
+async def _dispatch_all(creds, services: Dict[str, bool], ayr_key: str, posts: List[Post]) -> None:
+    """Send all posts concurrently, at most AGENT_CONCURRENCY at a time."""
+    sem = asyncio.Semaphore(AGENT_CONCURRENCY)
+    _size_thread_pool(AGENT_CONCURRENCY)
+
+    async def _send(post: Post) -> None:
+        async with sem:
+            try:
+                await asyncio.to_thread(_dispatch, creds, services, ayr_key, post)
+            except Exception as e:
+                LOG.error("Failed to distribute post: %s", e)
+
+    await asyncio.gather(*(_send(post) for post in posts))
 
 if __name__ == "__main__":
     content_dir = pathlib.Path("content")  # Directory with content files
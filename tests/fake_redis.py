@@ -0,0 +1,116 @@
+"""Single-process, in-memory stand-in for the Redis calls the agents make."""
+
+class Idle(BaseException):
+    """Raised by blmove on an empty list, where a real server would block.
+
+    A BaseException so the agents' ``except Exception`` loops let it end the test.
+    """
+
+class FakePipeline:
+    def __init__(self, redis: "FakeRedis"):
+        self._redis = redis
+        self._calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self._redis, name)
+
+        def queue(*args, **kwargs):
+            self._calls.append((method, args, kwargs))
+            return self
+        return queue
+
+    def execute(self):
+        calls, self._calls = self._calls, []
+        if self._redis.fail_execute:
+            raise self._redis.fail_execute
+        return [method(*args, **kwargs) for method, args, kwargs in calls]
+
+class FakeRedis:
+    def __init__(self):
+        self.data = {}
+        # Exception every pipeline execute() raises, before applying any command
+        self.fail_execute = None
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+        return True
+
+    def setex(self, key, ttl, value):
+        return self.set(key, value)
+
+    def delete(self, *keys):
+        return sum(self.data.pop(key, None) is not None for key in keys)
+
+    def lpush(self, key, *values):
+        items = self.data.setdefault(key, [])
+        for value in values:
+            items.insert(0, value)
+        return len(items)
+
+    def lmove(self, src, dst, wherefrom="LEFT", whereto="RIGHT"):
+        items = self.data.get(src)
+        if not items:
+            return None
+        value = items.pop(0 if wherefrom == "LEFT" else -1)
+        target = self.data.setdefault(dst, [])
+        if whereto == "LEFT":
+            target.insert(0, value)
+        else:
+            target.append(value)
+        return value
+
+    def blmove(self, src, dst, timeout, wherefrom="LEFT", whereto="RIGHT"):
+        if not self.data.get(src):
+            raise Idle(src)
+        return self.lmove(src, dst, wherefrom, whereto)
+
+    def lrem(self, key, count, value):
+        items = self.data.get(key, [])
+        removed = 0
+        for i in [i for i, item in enumerate(items) if item == value][:count or None]:
+            del items[i - removed]
+            removed += 1
+        return removed
+
+    def lrange(self, key, start, end):
+        items = self.data.get(key, [])
+        return items[start:None if end == -1 else end + 1]
+
+    def llen(self, key):
+        return len(self.data.get(key, []))
+
+    def sadd(self, key, *members):
+        members_set = self.data.setdefault(key, set())
+        before = len(members_set)
+        members_set.update(members)
+        return len(members_set) - before
+
+    def smismember(self, key, members):
+        members_set = self.data.get(key, set())
+        return [member in members_set for member in members]
+
+    def zadd(self, key, mapping):
+        self.data.setdefault(key, {}).update(mapping)
+        return len(mapping)
+
+    def zremrangebyscore(self, key, low, high):
+        zset = self.data.get(key, {})
+        low = float(low)
+        doomed = [m for m, score in zset.items() if low <= score <= high]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
+
+    def zremrangebyrank(self, key, start, end):
+        zset = self.data.get(key, {})
+        ranked = sorted(zset, key=zset.get)
+        doomed = ranked[start:None if end == -1 else end + 1]
+        for member in doomed:
+            del zset[member]
+        return len(doomed)
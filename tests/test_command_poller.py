@@ -0,0 +1,126 @@
+import os
+import pathlib
+import tempfile
+import unittest
+from unittest import mock
+
+from agents import command_poller
+from agents.command_poller import CommandFileTail
+from tests.fake_redis import FakeRedis
+
+SCAN_A = "SCAN_SITE domain=a.com"
+SCAN_B = "SCAN_SITE domain=b.com"
+
+class TestCommandFileTail(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.temp_dir.name) / "command_queue.txt"
+        self.path.write_text("# Add commands below\nSCAN_SITE a.com\n")
+        self.tail = CommandFileTail(self.path)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _append(self, text: str):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def _bump_mtime(self):
+        st = self.path.stat()
+        os.utime(self.path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+    def test_unchanged_file(self):
+        self.assertEqual(self.tail.read(), ["SCAN_SITE a.com"])
+        self.assertEqual(self.tail.read(), ["SCAN_SITE a.com"])
+
+    def test_append(self):
+        self.tail.read()
+        self._append("SCAN_SITE b.com\n")
+        self.assertEqual(self.tail.read(), ["SCAN_SITE a.com", "SCAN_SITE b.com"])
+
+    def test_partial_last_line(self):
+        self.tail.read()
+        self._append("SCAN_SITE b")
+        self.assertEqual(self.tail.read(), ["SCAN_SITE a.com", "SCAN_SITE b"])
+        self._append(".com\n")
+        self.assertEqual(self.tail.read(), ["SCAN_SITE a.com", "SCAN_SITE b.com"])
+
+    def test_truncation(self):
+        self.tail.read()
+        self.path.write_text("SCAN_SITE c.com\n")
+        self.assertEqual(self.tail.read(), ["SCAN_SITE c.com"])
+
+    def test_same_size_rewrite(self):
+        self.tail.read()
+        with open(self.path, "r+") as f:
+            f.write("# Add commands below\nSCAN_SITE z.com\n")
+        self._bump_mtime()
+        self.assertEqual(self.tail.read(), ["SCAN_SITE z.com"])
+
+    def test_edit_before_append(self):
+        self.tail.read()
+        self.path.write_text("# Add commands below\nSCAN_SITE z.com\nSCAN_SITE b.com\n")
+        self.assertEqual(self.tail.read(), ["SCAN_SITE z.com", "SCAN_SITE b.com"])
+
+    def test_file_replaced(self):
+        self.tail.read()
+        replacement = self.path.with_name("command_queue.new")
+        replacement.write_text("# Add commands below\nSCAN_SITE d.com\nSCAN_SITE e.com\n")
+        os.replace(replacement, self.path)
+        self.assertEqual(self.tail.read(), ["SCAN_SITE d.com", "SCAN_SITE e.com"])
+
+class TestPollerRunOnce(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patches = [
+            mock.patch.object(command_poller, "r", self.redis),
+            mock.patch.object(command_poller, "GoogleDocsClient"),
+            mock.patch.object(command_poller, "NotionClient"),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        self.poller = self._poller()
+
+    def _poller(self):
+        poller = command_poller.Poller()
+        poller.validate = mock.Mock(wraps=poller.validate)
+        return poller
+
+    def _tick(self, poller, lines):
+        poller.google_client.read_doc.return_value = lines
+        poller.validate.reset_mock()
+        poller.run_once()
+        return [c.args[0] for c in poller.validate.call_args_list]
+
+    def _queued(self):
+        return [command_poller.json.loads(raw)["raw"]
+                for raw in self.redis.lrange("agent_tasks:SCAN_SITE", 0, -1)]
+
+    def test_only_appended_lines_are_pushed(self):
+        self.assertEqual(self._tick(self.poller, [SCAN_A]), [SCAN_A])
+        self.assertEqual(self._tick(self.poller, [SCAN_A]), [])
+        with mock.patch.object(self.redis, "smismember", wraps=self.redis.smismember) as seen:
+            self.assertEqual(self._tick(self.poller, [SCAN_A, SCAN_B]), [SCAN_B])
+        # Lines from the last tick aren't even looked up again
+        self.assertEqual(seen.call_args.args[1], [command_poller._hash(SCAN_B)])
+        self.assertEqual(self._queued(), [SCAN_B, SCAN_A])
+
+    def test_restarted_poller_skips_processed_lines(self):
+        self._tick(self.poller, [SCAN_A])
+        self.assertEqual(self._tick(self._poller(), [SCAN_A, SCAN_B]), [SCAN_B])
+        self.assertEqual(self._queued(), [SCAN_B, SCAN_A])
+
+    def test_failed_push_marks_nothing_processed(self):
+        self.redis.fail_execute = ConnectionError("down")
+        with self.assertRaises(ConnectionError):
+            self._tick(self.poller, [SCAN_A])
+        self.assertEqual(self._queued(), [])
+        self.assertIsNone(self.redis.get(command_poller._processed_key()))
+
+        self.redis.fail_execute = None
+        self.assertEqual(self._tick(self.poller, [SCAN_A]), [SCAN_A])
+        self.assertEqual(self._queued(), [SCAN_A])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,13 @@
 import unittest
 import tempfile
 import os
-from agents.content_distribution_agent import Post, load_content, _choose_channel
+import pathlib
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from agents import content_distribution_agent as agent
+from agents.content_distribution_agent import Post, load_content, iter_content, _choose_channel
 
 class TestContentDistributionAgent(unittest.TestCase):
     def setUp(self):
@@ -19,6 +25,167 @@ class TestContentDistributionAgent(unittest.TestCase):
         self.assertEqual(len(posts), 1)
         self.assertEqual(posts[0].text, "Test content")
 
+    def test_load_content_directory(self):
+        other = os.path.join(self.temp_dir, "a.txt")
+        with open(other, "w") as f:
+            f.write("First")
+        try:
+            posts = load_content(self.temp_dir)
+        finally:
+            os.remove(other)
+        self.assertEqual([p.text for p in posts], ["First", "Test content"])
+
+    def test_crlf_posts_read_with_unix_newlines(self):
+        with open(self.test_file, "wb") as f:
+            f.write(b"Line one\r\nLine two\r\n")
+        for source in (self.test_file, self.temp_dir):
+            post, = load_content(source)
+            self.assertEqual(post.text, "Line one\nLine two\n")
+            # Same id as posts already in the ledger, which were read with newline translation
+            self.assertEqual(post.post_id, Post(text="Line one\nLine two\n", media=[]).post_id)
+
+    def test_iter_content_reads_ahead_in_order(self):
+        names = [f"post{i:02}.txt" for i in range(20)]
+        for name in names:
+            with open(os.path.join(self.temp_dir, name), "w") as f:
+                f.write(name)
+        # The first READ_AHEAD reads only finish once all of them are running
+        barrier = threading.Barrier(agent.READ_AHEAD, timeout=5)
+        lock = threading.Lock()
+        running, peak = 0, 0
+        read_post = agent._read_post
+
+        def slow_read(path):
+            nonlocal running, peak
+            with lock:
+                running += 1
+                peak = max(peak, running)
+            try:
+                if os.path.basename(path) < names[agent.READ_AHEAD]:
+                    barrier.wait()
+                return read_post(path)
+            finally:
+                with lock:
+                    running -= 1
+
+        try:
+            with mock.patch.object(agent, "_read_post", side_effect=slow_read):
+                texts = [p.text for p in iter_content(self.temp_dir, skip_sent=False)]
+        finally:
+            for name in names:
+                os.remove(os.path.join(self.temp_dir, name))
+        self.assertEqual(texts, names + ["Test content"])
+        self.assertLessEqual(peak, agent.READ_AHEAD)
+
+    def test_iter_content_matches_load_content(self):
+        lazy = [p.text for p in iter_content(self.temp_dir)]
+        eager = [p.text for p in load_content(self.temp_dir)]
+        self.assertEqual(lazy, eager)
+
+    def _run_main(self, ledger, sent_cache, sends):
+        with mock.patch.object(agent, "LEDGER", ledger), \
+                mock.patch.object(agent, "SENT_CACHE", sent_cache), \
+                mock.patch.object(agent, "_google_creds", return_value=(None, "project")), \
+                mock.patch.object(agent, "_discover_services", return_value={"Gmail": True}), \
+                mock.patch.object(agent, "_ayrshare_key", side_effect=RuntimeError("no key")), \
+                mock.patch.object(agent, "_distribute_one",
+                                  side_effect=lambda creds, services, key, post: sends.append(post.text)), \
+                mock.patch("sys.argv", ["agent", "--content", self.temp_dir]):
+            agent.main()
+
+    def test_main_rerun_on_sent_source_succeeds(self):
+        ledger = pathlib.Path(self.temp_dir) / "sent.log"
+        sent_cache, sends = set(), []
+        try:
+            self._run_main(ledger, sent_cache, sends)
+            self.assertEqual(sends, ["Test content"])
+            # Everything is in the ledger now: the second run sends nothing and doesn't exit(1)
+            self._run_main(ledger, sent_cache, sends)
+            self.assertEqual(sends, ["Test content"])
+        finally:
+            if ledger.exists():
+                ledger.unlink()
+
+    def test_main_records_in_run_duplicate_files(self):
+        copy = os.path.join(self.temp_dir, "copy.txt")
+        with open(copy, "w") as f:
+            f.write("Test content")
+        ledger = pathlib.Path(self.temp_dir) / "sent.log"
+        sent_cache, sends = set(), []
+        try:
+            self._run_main(ledger, sent_cache, sends)
+            self.assertEqual(sends, ["Test content"])
+            # Both files are in the ledger, so the next run skips them without reading
+            for path in (copy, self.test_file):
+                key = agent._file_key(os.path.basename(path), os.stat(path))
+                self.assertIn(key, sent_cache)
+        finally:
+            os.remove(copy)
+            if ledger.exists():
+                ledger.unlink()
+
+    def test_main_empty_source_fails(self):
+        os.remove(self.test_file)
+        try:
+            with self.assertRaises(SystemExit) as cm:
+                self._run_main(pathlib.Path(self.temp_dir) / "sent.log", set(), [])
+            self.assertEqual(cm.exception.code, 1)
+        finally:
+            with open(self.test_file, "w") as f:
+                f.write("Test content")
+
+    def test_ayrshare_session_shared_across_threads(self):
+        with mock.patch.object(agent, "_AYR_SESSIONS", {}):
+            with ThreadPoolExecutor(max_workers=8) as ex:
+                sessions = list(ex.map(agent._ayrshare_session, ["key"] * 32))
+            self.assertEqual(len({id(s) for s in sessions}), 1)
+            self.assertIsNot(agent._ayrshare_session("other"), sessions[0])
+
+    def test_sends_reach_agent_concurrency_on_few_cpus(self):
+        # Every send waits until all eight are running at once
+        barrier = threading.Barrier(8, timeout=5)
+        sent = []
+
+        def send(creds, services, key, post):
+            barrier.wait()
+            sent.append(post.text)
+
+        posts = [Post(text=f"post {i}", media=[]) for i in range(8)]
+        # 1 CPU caps the loop's default executor at 5 threads
+        with mock.patch("os.cpu_count", return_value=1), \
+                mock.patch.object(agent, "SENT_CACHE", set()), \
+                mock.patch.object(agent, "_update_ledger"), \
+                mock.patch.object(agent, "_distribute_one", side_effect=send):
+            asyncio.run(agent._distribute_async(None, {}, "", posts, concurrency=8))
+        self.assertEqual(sorted(sent), sorted(p.text for p in posts))
+
+    def _discover(self, probes):
+        cache = pathlib.Path(self.temp_dir) / "services.json"
+        with mock.patch.object(agent, "_SERVICE_PROBES", probes), \
+                mock.patch.object(agent, "SERVICES_CACHE", cache):
+            services = agent._discover_services(None)
+        cached = cache.exists()
+        if cached:
+            cache.unlink()
+        return services, cached
+
+    def test_discover_services_caches_complete_results(self):
+        def refused(creds):
+            # googleapiclient's HttpError carries the HTTP response as .resp
+            error = Exception("forbidden")
+            error.resp = mock.Mock(status=403)
+            raise error
+        services, cached = self._discover({"Gmail": lambda creds: True, "YouTube": refused})
+        self.assertEqual(services, {"Gmail": True, "YouTube": False})
+        self.assertTrue(cached)
+
+    def test_discover_services_does_not_cache_probe_errors(self):
+        def flaky(creds):
+            raise ConnectionError("timed out")
+        services, cached = self._discover({"Gmail": lambda creds: True, "YouTube": flaky})
+        self.assertEqual(services, {"Gmail": True, "YouTube": False})
+        self.assertFalse(cached)
+
     def test_choose_channel(self):
         services = {
             "Gmail": True,
@@ -0,0 +1,201 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest import mock
+
+import pandas as pd
+
+from agents import report_generator
+from agents.report_generator import ReportGenerator, EXCEL_SCAN_COLUMNS, _scan_row
+from tests.fake_redis import FakeRedis, Idle
+
+NOW = datetime(2024, 1, 2, 3, 4, 5)
+
+SCANS = [
+    {
+        'domain': 'https://a.com',
+        'scan_time': 't1',
+        'basic_info': {'status_code': 200},
+        'performance': {'load_times': {'full_page': 123.4}},
+        'security': {'score': 55},
+        'seo': {'score': 70},
+        'vulnerabilities': [{}, {}],
+        'technologies': [{}],
+    },
+    {
+        # Failed scan: missing sections and explicit nulls fall back to the defaults
+        'domain': 'https://b.com',
+        'scan_time': 't2',
+        'basic_info': {},
+        'performance': {'load_times': {'full_page': None}},
+        'security': {},
+        'seo': {},
+        'vulnerabilities': [],
+        'technologies': None,
+    },
+]
+
+class TestReportGenerator(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(self.temp_dir.name)
+        self.generator = ReportGenerator()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.temp_dir.cleanup()
+
+    def _csv(self, data: dict) -> str:
+        path = self.generator._generate_csv_report('c', 'd', data, NOW)
+        with open(path, newline='') as f:
+            return f.read()
+
+    def test_csv_empty_report(self):
+        self.assertEqual(self._csv({}), 'type,client,dataset,timestamp\n')
+
+    def test_csv_scans_only(self):
+        self.assertEqual(self._csv({'scan_results': SCANS}), (
+            'type,client,dataset,timestamp,domain,status_code,load_time_ms,security_score,'
+            'seo_score,vulnerability_count,technology_count\n'
+            'scan,c,d,t1,https://a.com,200,123.4,55,70,2,1\n'
+            'scan,c,d,t2,https://b.com,,0,0,0,0,0\n'
+        ))
+
+    def test_csv_scans_and_distributions(self):
+        dists = [{'Twitter': 'success', 'Email': {'status': 'failed'}}, {}]
+        self.assertEqual(self._csv({'scan_results': SCANS, 'distribution_results': dists}), (
+            'type,client,dataset,timestamp,domain,status_code,load_time_ms,security_score,'
+            'seo_score,vulnerability_count,technology_count,'
+            'distribution_id,platforms_total,platforms_success,platforms_failed\n'
+            'scan,c,d,t1,https://a.com,200,123.4,55,70,2,1,,,,\n'
+            'scan,c,d,t2,https://b.com,,0,0,0,0,0,,,,\n'
+            'distribution,c,d,2024-01-02T03:04:05,,,,,,,,0,2,1,1\n'
+            'distribution,c,d,2024-01-02T03:04:05,,,,,,,,1,0,0,0\n'
+        ))
+
+    def test_excel_scan_sheet_matches_csv_rows(self):
+        path = self.generator._generate_excel_report('c', 'd', {'scan_results': SCANS}, NOW)
+        sheet = pd.read_excel(path, sheet_name='Scan Results', keep_default_na=False)
+        self.assertEqual(list(sheet.columns), list(EXCEL_SCAN_COLUMNS.values()))
+        expected = [[row[col] for col in EXCEL_SCAN_COLUMNS] for row in map(_scan_row, SCANS)]
+        self.assertEqual(sheet.values.tolist(), expected)
+
+    def test_metrics_skip_missing_and_null_sections(self):
+        scans = SCANS + [{'domain': 'https://c.com', 'performance': None, 'security': None}]
+        with mock.patch.object(ReportGenerator, "_load_results", side_effect=[scans, []]):
+            data = self.generator._gather_report_data('c', 'd', NOW)
+        self.assertEqual(data['performance_metrics'], {
+            'avg_load_time': 123.4, 'min_load_time': 123.4, 'max_load_time': 123.4, 'total_scans': 1,
+        })
+        self.assertEqual(data['summary_stats'], {
+            'avg_security_score': 55, 'min_security_score': 55, 'max_security_score': 55,
+        })
+
+def _report_task(task_id: str) -> bytes:
+    params = {'client': task_id, 'dataset': 'd', 'format': 'csv'}
+    return json.dumps({'type': 'PUBLISH_REPORT', 'id': task_id, 'params': params}).encode()
+
+def _crash_first_worker(client, dataset, format_type):
+    # The first render takes its worker process down, as an OOM kill would
+    if not os.path.exists('crashed'):
+        open('crashed', 'w').close()
+        os._exit(1)
+    return f"{client}.csv", NOW
+
+def _hang_worker(client, dataset, format_type):
+    if client == 'hang':
+        time.sleep(60)
+    return f"{client}.csv", NOW
+
+class TestReportLoop(unittest.TestCase):
+    def setUp(self):
+        cwd = os.getcwd()
+        temp_dir = tempfile.TemporaryDirectory()
+        os.chdir(temp_dir.name)
+        self.addCleanup(temp_dir.cleanup)
+        self.addCleanup(os.chdir, cwd)
+        self.redis = FakeRedis()
+        patch = mock.patch.object(report_generator, "r", self.redis)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.generated = []
+
+    def _worker(self, client, dataset, format_type):
+        self.generated.append(client)
+        return f"{client}.csv", NOW
+
+    def _run_loop(self, worker=None, processes=False):
+        generator = ReportGenerator()
+        if not processes:
+            generator._pool = ThreadPoolExecutor(max_workers=1)
+        with mock.patch.object(report_generator, "_generate_report_worker", worker or self._worker):
+            with self.assertRaises(Idle):
+                generator.loop()
+        if generator._pool:
+            generator._pool.shutdown()
+
+    def test_leftover_inflight_tasks_are_requeued_and_cleared(self):
+        scan = json.dumps({'type': 'SCAN_SITE', 'id': 's', 'params': {'domain': 'a.com'}}).encode()
+        self.redis.lpush(report_generator.REPORT_INFLIGHT, _report_task('left'))
+        self.redis.lpush(report_generator.REPORT_QUEUE, _report_task('new'), scan)
+        self._run_loop()
+        self.assertEqual(self.generated, ['left', 'new'])
+        self.assertEqual(self.redis.llen(report_generator.REPORT_INFLIGHT), 0)
+        self.assertIsNotNone(self.redis.get('report_result:left'))
+        self.assertIsNotNone(self.redis.get('report_result:new'))
+        self.assertEqual(self.redis.lrange('agent_tasks:SCAN_SITE', 0, -1), [scan])
+
+    def test_task_stays_inflight_until_its_result_is_stored(self):
+        def failing_worker(*args):
+            self.redis.fail_execute = ConnectionError("down")
+            return self._worker(*args)
+
+        self.redis.lpush(report_generator.REPORT_QUEUE, _report_task('t'))
+        self._run_loop(failing_worker)
+        self.assertEqual(self.redis.lrange(report_generator.REPORT_INFLIGHT, 0, -1), [_report_task('t')])
+        self.assertIsNone(self.redis.get('report_result:t'))
+
+        # The next run picks the task up again
+        self.redis.fail_execute = None
+        self._run_loop()
+        self.assertEqual(self.generated, ['t', 't'])
+        self.assertEqual(self.redis.llen(report_generator.REPORT_INFLIGHT), 0)
+        self.assertIsNotNone(self.redis.get('report_result:t'))
+
+    def test_stored_generated_at_matches_the_report(self):
+        later = datetime(2024, 1, 2, 3, 5, 0)
+        task = json.loads(_report_task('t'))
+        with mock.patch.object(report_generator, "datetime", wraps=datetime) as clock, \
+                mock.patch.object(ReportGenerator, "_gather_report_data", return_value={}):
+            clock.now.side_effect = [NOW, later]
+            path = ReportGenerator().handle_report_task(task)
+        stored = json.loads(self.redis.get('report_result:t'))
+        self.assertIn(NOW.strftime("%Y%m%d_%H%M%S"), path)
+        self.assertEqual(stored['generated_at'], NOW.isoformat())
+
+    @mock.patch.object(report_generator, "REPORT_WORKERS", 2)
+    def test_crashed_worker_pool_is_rebuilt_and_task_requeued(self):
+        self.redis.lpush(report_generator.REPORT_QUEUE, _report_task('t'))
+        self._run_loop(_crash_first_worker, processes=True)
+        self.assertTrue(os.path.exists('crashed'))
+        self.assertEqual(self.redis.llen(report_generator.REPORT_INFLIGHT), 0)
+        self.assertEqual(self.redis.llen(report_generator.REPORT_QUEUE), 0)
+        self.assertIsNotNone(self.redis.get('report_result:t'))
+
+    @mock.patch.object(report_generator, "REPORT_WORKERS", 2)
+    @mock.patch.object(report_generator, "REPORT_TIMEOUT_SECONDS", 1)
+    def test_hung_render_is_dropped_without_stalling_the_batch(self):
+        self.redis.lpush(report_generator.REPORT_QUEUE, _report_task('hang'), _report_task('ok'))
+        self._run_loop(_hang_worker, processes=True)
+        self.assertEqual(self.redis.llen(report_generator.REPORT_INFLIGHT), 0)
+        self.assertEqual(self.redis.llen(report_generator.REPORT_QUEUE), 0)
+        self.assertIsNone(self.redis.get('report_result:hang'))
+        self.assertIsNotNone(self.redis.get('report_result:ok'))
+
+if __name__ == "__main__":
+    unittest.main()
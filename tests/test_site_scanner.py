@@ -0,0 +1,151 @@
+import gzip
+import http.server
+import json
+import threading
+import time
+import unittest
+from unittest import mock
+
+from agents import site_scanner
+from agents.site_scanner import SiteScanner
+from tests.fake_redis import FakeRedis, Idle
+
+def _scan_task(domain: str) -> bytes:
+    return json.dumps({'type': 'SCAN_SITE', 'id': domain, 'params': {'domain': domain}}).encode()
+
+class TestSiteScanner(unittest.TestCase):
+    def setUp(self):
+        self.scanner = SiteScanner()
+
+    def tearDown(self):
+        self.scanner._probe_pool.shutdown()
+
+    def test_failed_page_fetch_keeps_probe_results(self):
+        ssl_info = {'issuer': {'organizationName': 'CA'}}
+        with mock.patch.object(self.scanner, "_fetch_page", side_effect=ConnectionError("reset")), \
+                mock.patch.object(self.scanner, "_fetch_ssl_info", return_value=ssl_info), \
+                mock.patch.object(self.scanner, "_has_directory_listing", return_value=True):
+            results = self.scanner.scan_domain("example.com")
+        self.assertEqual(results['error'], "reset")
+        self.assertEqual(results['security']['ssl_info'], ssl_info)
+        self.assertEqual([v['type'] for v in results['vulnerabilities']], ['Directory Listing'])
+
+class _BodyHandler(http.server.BaseHTTPRequestHandler):
+    page = b"<html><body>Index of /wp-admin</body></html>"
+    # 16 MB of zeros compresses to about 16 KB
+    bomb = gzip.compress(bytes(16 * 1024 * 1024))
+
+    def do_GET(self):
+        if self.path == '/bomb':
+            self._headers(len(self.bomb), gzip=True)
+            self.wfile.write(self.bomb)
+        elif self.path == '/drip':
+            # Each byte arrives well inside the read timeout, but the body never finishes
+            self._headers(1000)
+            try:
+                for _ in range(1000):
+                    self.wfile.write(b"x")
+                    self.wfile.flush()
+                    time.sleep(0.1)
+            except OSError:
+                pass
+        else:
+            self._headers(len(self.page))
+            self.wfile.write(self.page)
+
+    def _headers(self, length: int, gzip: bool = False):
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(length))
+        if gzip:
+            self.send_header('Content-Encoding', 'gzip')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+class TestGetCapped(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), _BodyHandler)
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f"http://127.0.0.1:{cls.server.server_port}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.scanner = SiteScanner()
+        self.addCleanup(self.scanner._probe_pool.shutdown)
+
+    def test_small_body_is_read_whole(self):
+        response, body = self.scanner._get_capped(f"{self.base}/", 1024, 5, timeout=5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(body, _BodyHandler.page)
+
+    def test_compressed_body_is_capped_after_decoding(self):
+        _, body = self.scanner._get_capped(f"{self.base}/bomb", 1024 * 1024, 5, timeout=5)
+        self.assertEqual(body, bytes(1024 * 1024))
+
+    def test_trickled_body_stops_at_the_deadline(self):
+        start = time.monotonic()
+        _, body = self.scanner._get_capped(f"{self.base}/drip", 1024, 1, timeout=5)
+        self.assertLess(time.monotonic() - start, 3)
+        # Whatever sat in the interrupted read is lost; the rest is kept
+        self.assertLess(len(body), 1000)
+
+    def test_listing_probe(self):
+        self.assertTrue(self.scanner._has_directory_listing(self.base))
+
+class TestScanLoop(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        patch = mock.patch.object(site_scanner, "r", self.redis)
+        patch.start()
+        self.addCleanup(patch.stop)
+        self.scanner = SiteScanner()
+        self.addCleanup(self.scanner._probe_pool.shutdown)
+        self.scanned = []
+
+    def _scan(self, domain):
+        self.scanned.append(domain)
+        return {'domain': domain}
+
+    def _run_loop(self, scan=None):
+        with mock.patch.object(self.scanner, "scan_domain", side_effect=scan or self._scan):
+            with self.assertRaises(Idle):
+                self.scanner.loop()
+
+    def test_leftover_inflight_tasks_are_requeued_and_cleared(self):
+        report = json.dumps({'type': 'PUBLISH_REPORT', 'id': 'r', 'params': {}}).encode()
+        self.redis.lpush(site_scanner.SCAN_INFLIGHT, _scan_task('left.com'))
+        self.redis.lpush(site_scanner.SCAN_QUEUE, _scan_task('new.com'), report)
+        self._run_loop()
+        self.assertEqual(self.scanned, ['left.com', 'new.com'])
+        self.assertEqual(self.redis.llen(site_scanner.SCAN_INFLIGHT), 0)
+        self.assertIsNotNone(self.redis.get('scan_result:left.com'))
+        self.assertIsNotNone(self.redis.get('scan_result:new.com'))
+        self.assertEqual(self.redis.lrange('agent_tasks:PUBLISH_REPORT', 0, -1), [report])
+
+    def test_task_stays_inflight_until_its_result_is_stored(self):
+        def failing_scan(domain):
+            self.redis.fail_execute = ConnectionError("down")
+            return self._scan(domain)
+
+        self.redis.lpush(site_scanner.SCAN_QUEUE, _scan_task('t.com'))
+        self._run_loop(failing_scan)
+        self.assertEqual(self.redis.lrange(site_scanner.SCAN_INFLIGHT, 0, -1), [_scan_task('t.com')])
+        self.assertIsNone(self.redis.get('scan_result:t.com'))
+
+        # The next run picks the task up again
+        self.redis.fail_execute = None
+        self._run_loop()
+        self.assertEqual(self.scanned, ['t.com', 't.com'])
+        self.assertEqual(self.redis.llen(site_scanner.SCAN_INFLIGHT), 0)
+        self.assertIsNotNone(self.redis.get('scan_result:t.com'))
+
+if __name__ == "__main__":
+    unittest.main()